@@ -0,0 +1,43 @@
+#Benchmark for the on-disk parse cache.
+#
+#This script writes a synthetic MASCOT peptide export and times ReadFile on a cold cache
+#(parse and store) and on a warm cache (load only).
+#
+#Usage: python benchmarks/bench_cache.py [number_of_rows]
+#
+#This script uses Python3.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trypn import cache
+from trypn.mascot import ReadFile, PEPTIDE_MARKER
+from bench_reader import WriteExport
+
+def Time(path):
+	start = time.perf_counter()
+	peptides = set(ReadFile(path, PEPTIDE_MARKER, ["seq", "mod"]))
+	return time.perf_counter() - start, peptides
+
+
+if __name__ == "__main__":
+	rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+	directory = tempfile.mkdtemp()
+	cache.CACHE_DIR = os.path.join(directory, "cache")
+	path = os.path.join(directory, "export.csv")
+	WriteExport(path, rows)
+
+	cold_time, cold_peptides = Time(path)
+	warm_time, warm_peptides = Time(path)
+	shutil.rmtree(directory)
+
+	print("Rows:", rows)
+	print("Cold cache (parse and store):", round(cold_time, 3), "s", sep="\t")
+	print("Warm cache (load):", round(warm_time, 3), "s", sep="\t")
+	print("Warm/cold:", round(warm_time/cold_time, 3), sep="\t")
+	if cold_peptides != warm_peptides: print("WARNING: unique peptide sets differ")
@@ -0,0 +1,73 @@
+#Memory benchmark for the integer peptide encoding.
+#
+#This script writes a synthetic MASCOT peptide export and measures the peak memory (tracemalloc) of
+#building the trimmed-peptide index of compare_tryspin_trypn_peptides.py in two ways:
+#	tuples: rows read into a list, peptides held as (sequence, modifications) tuples
+#	integers: rows streamed through ReadFile, peptides held as PeptideDictionary keys
+#
+#Usage: python benchmarks/bench_memory.py [number_of_rows]
+#
+#This script uses Python3.
+
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trypn import cache
+from trypn.dictionary import PeptideDictionary, KeyArray
+from trypn.mascot import ReadRows, ReadPeptides, CleanMod, PEPTIDE_MARKER
+from bench_reader import WriteExport
+
+def TupleIndex(path):
+	fin = open(path, "r")
+	rows = list(ReadRows(fin, PEPTIDE_MARKER, ["prev_aa", "seq", "next_aa", "mod", "accession"]))
+	fin.close()
+
+	uniq_peptides = set([(row[1], CleanMod(row[3])) for row in rows])
+	peptides = {}
+	for peptide in uniq_peptides:
+		trimmed = (peptide[0][:-1], peptide[1])
+		if trimmed not in peptides: peptides[trimmed] = ["Trypsin", None, [], []]
+		peptides[trimmed][2].append(peptide)
+	return len(peptides)
+
+def IntegerIndex(path):
+	dictionary = PeptideDictionary()
+	uniq_peptides = set(dictionary.EncodeAll(ReadPeptides(path)))
+	peptides = {}
+	for peptide in uniq_peptides:
+		seq, mod = dictionary.Decode(peptide)
+		trimmed = dictionary.Encode(seq[:-1], mod)
+		if trimmed not in peptides: peptides[trimmed] = ["Trypsin", None, KeyArray(), KeyArray()]
+		peptides[trimmed][2].append(peptide)
+	return len(peptides)
+
+def Peak(function, path):
+	tracemalloc.start()
+	result = function(path)
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return peak, result
+
+
+if __name__ == "__main__":
+	rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+	directory = tempfile.mkdtemp()
+	cache.CACHE_DIR = os.path.join(directory, "cache")
+	path = os.path.join(directory, "export.csv")
+	WriteExport(path, rows)
+
+	tuple_peak, tuple_result = Peak(TupleIndex, path)
+	cold_peak, cold_result = Peak(IntegerIndex, path)
+	warm_peak, warm_result = Peak(IntegerIndex, path)
+	shutil.rmtree(directory)
+
+	print("Rows:", rows)
+	print("Tuples, rows in a list:", round(tuple_peak/2**20, 1), "MB", sep="\t")
+	print("Integers, cold cache:", round(cold_peak/2**20, 1), "MB", sep="\t")
+	print("Integers, warm cache:", round(warm_peak/2**20, 1), "MB", sep="\t")
+	if not tuple_result == cold_result == warm_result: print("WARNING: index sizes differ")
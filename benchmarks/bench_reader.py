@@ -0,0 +1,91 @@
+#Throughput benchmark for the shared MASCOT reader.
+#
+#This script writes a synthetic MASCOT peptide export and times the per-script loop that was used
+#before trypn.mascot (CleanLine followed by one split per extracted column) against ReadRows.
+#
+#Usage: python benchmarks/bench_reader.py [number_of_rows]
+#
+#This script uses Python3.
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from trypn.mascot import ReadRows, CleanMod, PEPTIDE_MARKER
+
+#Previous per-script function to clean up MASCOT CSV format, kept here as the reference
+def CleanLine(line):
+	quote = False
+
+	for i in range(len(line)):
+		if quote == False and line[i] == "\"": quote = True
+		elif quote == True and line[i] == "\"": quote = False
+
+		if ((quote == True) and (line[i] == ",")): line = line[:i]+":"+line[i+1:]
+
+	return line
+
+#Previous per-script loop (as in calc_cleavages.py)
+def LegacyLoop(fin):
+	peptides = set()
+	build = False
+	for line in fin:
+		if line.find("prot_hit") == 0:
+			build = True
+			line = fin.readline()
+
+		if build == True:
+			line = CleanLine(line)
+			prev_aa = line.split(",")[22]
+			seq = line.split(",")[23]
+			next_aa = line.split(",")[24]
+			mod = line.split(",")[25].strip('\"')
+			if mod == "": mod = "None"
+			peptides.add((seq, mod))
+	return peptides
+
+#Shared reader loop
+def ReaderLoop(fin):
+	peptides = set()
+	for prev_aa, seq, next_aa, mod in ReadRows(fin, PEPTIDE_MARKER, ["prev_aa", "seq", "next_aa", "mod"]):
+		peptides.add((seq, CleanMod(mod)))
+	return peptides
+
+#Write a peptide export with a quoted, comma-heavy protein description on each row
+def WriteExport(path, rows):
+	fout = open(path, "w")
+	fout.write("Header\n\"Search title\",\"benchmark, synthetic\"\n\nProtein hits\n")
+	fout.write("prot_hit_num,prot_family_member,prot_acc,prot_desc" + ",col"*18 + ",pep_res_before,pep_seq,pep_res_after,pep_var_mod,pep_var_mod_pos,pep_scan_title\n")
+	for i in range(rows):
+		desc = "\"Protein %d, isoform %d, putative, uncharacterized, OS=Homo sapiens, OX=9606, GN=GENE%d\"" % (i, i%7, i)
+		mod = "\"Oxidation (M)\"" if i%3 == 0 else "\"\""
+		fout.write("%d,1,P%05d,%s%s,K,PEPTIDE%dK,A,%s,\"0.0\",\"scan, %d\"\n" % (i, i%5000, desc, ",0"*18, i%20000, mod, i))
+	fout.close()
+
+def Time(function, path):
+	fin = open(path, "r")
+	start = time.perf_counter()
+	peptides = function(fin)
+	elapsed = time.perf_counter() - start
+	fin.close()
+	return elapsed, peptides
+
+
+if __name__ == "__main__":
+	rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+	handle, path = tempfile.mkstemp(suffix=".csv")
+	os.close(handle)
+	WriteExport(path, rows)
+
+	legacy_time, legacy_peptides = Time(LegacyLoop, path)
+	reader_time, reader_peptides = Time(ReaderLoop, path)
+	os.remove(path)
+
+	print("Rows:", rows)
+	print("Legacy CleanLine loop:", round(legacy_time, 3), "s", round(rows/legacy_time), "rows/s", sep="\t")
+	print("trypn.mascot.ReadRows:", round(reader_time, 3), "s", round(rows/reader_time), "rows/s", sep="\t")
+	print("Speedup:", round(legacy_time/reader_time, 1), sep="\t")
+	if legacy_peptides != reader_peptides: print("WARNING: unique peptide sets differ")
@@ -0,0 +1,151 @@
+#Throughput benchmark suite for every workflow.
+#
+#This script writes synthetic MASCOT exports (see generate.py) at each number of rows and runs each workflow on them
+#through the trypn command, recording the time and the peak memory (maximum resident set size):
+#	cleavages				trypn cleavages Trypsin.csv TrypN.csv
+#	peptides-venn-3			trypn peptides-venn on the three Tryp-N replicates
+#	proteins-venn-3			trypn proteins-venn on the three Tryp-N protein replicates
+#	proteins-compare-2		trypn proteins-venn --table on the Trypsin and Tryp-N protein exports
+#	protease-compare		trypn protease-compare Trypsin.csv TrypN.csv
+#	protease-compare-no-mods	trypn protease-compare --no-mods Trypsin.csv TrypN.csv
+#
+#Each workflow runs in its own process so that its peak memory is measured on its own. By default every run
+#starts with an empty parse cache; --cache warm runs each workflow once before the recorded run, and
+#--cache off disables the cache.
+#
+#The results are saved as JSON (with the git revision, Python version and settings) so that versions can be compared:
+#	python benchmarks/bench_workflows.py --rows 10000 1000000 --output before.json
+#	python benchmarks/bench_workflows.py --rows 10000 1000000 --output after.json
+#	python benchmarks/bench_workflows.py --compare before.json after.json
+#
+#The default sizes are 10k, 1M and 10M rows. Each export of 10M rows takes about 2 GB of disk, and there are
+#ten exports in a set.
+#
+#This script uses Python3.
+
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#Arguments of the trypn command for each workflow; files are in the data directory
+WORKFLOWS = {
+	"cleavages": ["cleavages", "Trypsin.csv", "TrypN.csv"],
+	"peptides-venn-3": ["peptides-venn", "TrypN_replicate1.csv", "TrypN_replicate2.csv", "TrypN_replicate3.csv"],
+	"proteins-venn-3": ["proteins-venn", "TrypN_proteins1.csv", "TrypN_proteins2.csv", "TrypN_proteins3.csv"],
+	"proteins-compare-2": ["proteins-venn", "--table", "protein_comparison.log", "Trypsin_proteins.csv", "TrypN_proteins.csv"],
+	"protease-compare": ["protease-compare", "Trypsin.csv", "TrypN.csv"],
+	"protease-compare-no-mods": ["protease-compare", "--no-mods", "Trypsin.csv", "TrypN.csv"],
+}
+
+#Run one workflow in this process on the files in directory and print its time, peak memory and input size as JSON
+def Child(workflow, directory, extra):
+	sys.path.insert(0, ROOT)
+	from trypn.cli import Main
+
+	arguments = WORKFLOWS[workflow][:1] + extra + [os.path.join(directory, each) if each.endswith(".csv") else each for each in WORKFLOWS[workflow][1:]]
+	output = tempfile.mkdtemp()
+	os.chdir(output)
+
+	start = time.perf_counter()
+	stdout = sys.stdout
+	sys.stdout = open(os.devnull, "w")
+	Main(arguments)
+	sys.stdout = stdout
+	elapsed = time.perf_counter() - start
+
+	shutil.rmtree(output)
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin": peak = peak/1024		#bytes on macOS, kB elsewhere
+	size = sum([os.path.getsize(each) for each in arguments if each.endswith(".csv")])
+	print(json.dumps({"seconds": elapsed, "peak_mb": peak/1024, "input_mb": size/2**20}))
+
+#Run one workflow in a new process; returns its time, peak memory and input size
+def Run(workflow, directory, extra, env):
+	command = [sys.executable, os.path.abspath(__file__), "--child", workflow, directory] + ["--extra="+each for each in extra]
+	result = subprocess.run(command, env=env, stdout=subprocess.PIPE, check=True, universal_newlines=True)
+	return json.loads(result.stdout.strip().split("\n")[-1])
+
+#Git revision of the repository, if it is a git checkout
+def Revision():
+	try:
+		result = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True)
+		return result.stdout.strip() or None
+	except OSError:
+		return None
+
+#Print the ratio of the time and peak memory of each result in new to the same result in old
+def Compare(old, new):
+	before = {(each["workflow"], each["rows"]): each for each in old["results"]}
+	print("workflow", "rows", "seconds", "ratio", "peak_mb", "ratio", sep="\t")
+	for each in new["results"]:
+		key = (each["workflow"], each["rows"])
+		if key not in before: continue
+		print(each["workflow"], each["rows"], round(each["seconds"], 3), round(each["seconds"]/before[key]["seconds"], 2),
+			round(each["peak_mb"], 1), round(each["peak_mb"]/before[key]["peak_mb"], 2), sep="\t")
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Time and peak memory of each workflow on synthetic exports.")
+	parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000, 10000000], help="rows in each export (default 10000 1000000 10000000)")
+	parser.add_argument("--workflows", nargs="+", choices=list(WORKFLOWS), default=list(WORKFLOWS), help="workflows to run (default all)")
+	parser.add_argument("--overlap", type=float, default=0.5, help="overlap fraction of the exports (default 0.5)")
+	parser.add_argument("--cache", choices=["cold", "warm", "off"], default="cold", help="parse cache state for each run (default cold)")
+	parser.add_argument("--extra", action="append", default=[], help="extra option for the trypn command, e.g. --extra=--memory-budget=100")
+	parser.add_argument("--output", default="benchmark_results.json", help="JSON results file (default benchmark_results.json)")
+	parser.add_argument("--data", help="keep the generated exports in this directory (default a temporary directory)")
+	parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two results files instead of running")
+	parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.child:
+		Child(args.child[0], args.child[1], args.extra)
+		sys.exit()
+
+	if args.compare:
+		Compare(json.load(open(args.compare[0])), json.load(open(args.compare[1])))
+		sys.exit()
+
+	sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+	from generate import WriteAll
+
+	data = args.data or tempfile.mkdtemp()
+	results = []
+
+	for rows in args.rows:
+		directory = os.path.join(data, str(rows))
+		if not os.path.exists(os.path.join(directory, "TrypN_proteins3.csv")):
+			print("Writing", rows, "row exports to", directory, "...")
+			WriteAll(directory, rows, args.overlap)
+
+		for workflow in args.workflows:
+			env = dict(os.environ)
+			env["TRYPN_CACHE_DIR"] = tempfile.mkdtemp()
+			if args.cache == "off": env["TRYPN_CACHE"] = "0"
+			if args.cache == "warm": Run(workflow, directory, args.extra, env)
+
+			result = Run(workflow, directory, args.extra, env)
+			shutil.rmtree(env["TRYPN_CACHE_DIR"])
+
+			result["workflow"] = workflow
+			result["rows"] = rows
+			results.append(result)
+			print(workflow, rows, round(result["seconds"], 3), "s", round(result["peak_mb"], 1), "MB", sep="\t")
+
+	if not args.data: shutil.rmtree(data)
+
+	out = {"revision": Revision(), "date": str(datetime.now()), "python": platform.python_version(), "platform": platform.platform(),
+		"settings": {"overlap": args.overlap, "cache": args.cache, "extra": args.extra}, "results": results}
+	fout = open(args.output, "w")
+	json.dump(out, fout, indent=1)
+	fout.close()
+	print("Results written to", args.output)
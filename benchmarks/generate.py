@@ -0,0 +1,185 @@
+#Synthetic MASCOT exports for the benchmarks.
+#
+#A random proteome is digested in silico. Cutting after every K/R gives the tryptic peptides and cutting
+#before every K/R gives the Tryp-N peptides, so the Tryp-N peptide of a site is the tryptic peptide with its
+#K/R moved to the front, as in a real pair of digests. Flanking residues are taken from the protein, with "-"
+#at the protein termini.
+#
+#Each export of a set (e.g. three replicates) draws its peptides (or proteins) from a pool shared by every export
+#of the set and a pool of its own; the overlap fraction is the share of each export taken from the shared pool.
+#Every peptide is reported in several rows (PSMs), some with and some without modifications, under a quoted
+#protein description with embedded commas and quotes, as in a real export.
+#
+#Usage: python benchmarks/generate.py [--rows 10000] [--overlap 0.5] [--seed 1] directory
+#
+#This writes the inputs of every script into directory (e.g. Trypsin.csv, TrypN.csv, TrypN_replicate1.csv,
+#TrypN_proteins1.csv; see WriteAll). Generating large sets needs numpy, as installed with pandas.
+#
+#This script uses Python3.
+
+import argparse
+import os
+
+import numpy as np
+
+AA = b"ACDEFGHIKLMNPQRSTVWY"
+PROTEIN_LENGTH = 400		#Residues in each protein
+MIN_LENGTH = 6				#Range of tryptic peptide lengths kept, as seen by the mass spectrometer
+MAX_LENGTH = 30
+PSMS = 3					#Rows (peptide-spectrum matches) for each peptide
+
+PEPTIDE_HEADER = ["prot_hit_num", "prot_family_member", "prot_acc", "prot_desc", "prot_score", "prot_mass",
+	"prot_matches", "prot_matches_sig", "prot_sequences", "prot_sequences_sig", "pep_query", "pep_rank",
+	"pep_isbold", "pep_isunique", "pep_exp_mz", "pep_exp_mr", "pep_exp_z", "pep_calc_mr", "pep_delta",
+	"pep_score", "pep_expect", "pep_miss", "pep_res_before", "pep_seq", "pep_res_after", "pep_var_mod",
+	"pep_var_mod_pos", "pep_scan_title"]
+PROTEIN_HEADER = ["Family", "Member", "Database", "Accession", "Score", "Mass", "Description"]
+
+#A random proteome and its cleavage sites
+class Proteome:
+	#Build a proteome with at least npeptides tryptic peptides in the kept length range
+	def __init__(self, npeptides, seed=1):
+		rng = np.random.default_rng(seed)
+
+		#About 55% of the K/R-delimited segments have a kept length, with an average length of 10
+		nproteins = max(1, -(-npeptides*20 // PROTEIN_LENGTH))
+		while True:
+			residues = np.frombuffer(AA, dtype=np.uint8)[rng.integers(0, len(AA), nproteins*PROTEIN_LENGTH)]
+			self.Digest(residues)
+			if len(self.starts) >= npeptides: break
+			nproteins *= 2
+
+		self.residues = residues.tobytes()
+		self.nproteins = nproteins
+
+	#Find the tryptic peptides: segments ending after each K/R or at the end of a protein
+	def Digest(self, residues):
+		kr = np.flatnonzero((residues == ord("K")) | (residues == ord("R"))) + 1
+		ends = np.union1d(kr, np.arange(PROTEIN_LENGTH, len(residues)+1, PROTEIN_LENGTH))
+		starts = np.concatenate([[0], ends[:-1]])
+
+		lengths = ends - starts
+		keep = (lengths >= MIN_LENGTH) & (lengths <= MAX_LENGTH)
+		self.starts = starts[keep].astype(np.int64)
+		self.ends = ends[keep].astype(np.int64)
+
+	#Residue before position start of a protein, or "-" at its N-terminus
+	def Before(self, start):
+		if start % PROTEIN_LENGTH == 0: return "-"
+		return chr(self.residues[start-1])
+
+	#Residue at position end, or "-" past the C-terminus of a protein
+	def After(self, end):
+		if end % PROTEIN_LENGTH == 0: return "-"
+		return chr(self.residues[end])
+
+	#Tryptic peptide k: (residue before, sequence, residue after, protein number)
+	def Trypsin(self, k):
+		start, end = int(self.starts[k]), int(self.ends[k])
+		return self.Before(start), self.residues[start:end].decode(), self.After(end), start // PROTEIN_LENGTH
+
+	#Tryp-N peptide k: the cleavages are moved one residue towards the N-terminus, except at the protein termini
+	def TrypN(self, k):
+		start, end = int(self.starts[k]), int(self.ends[k])
+		if start % PROTEIN_LENGTH != 0: start -= 1
+		if end % PROTEIN_LENGTH != 0: end -= 1
+		return self.Before(start), self.residues[start:end].decode(), self.After(end), start // PROTEIN_LENGTH
+
+#Split the numbers 0..n-1 (shuffled) into a shared pool and one pool for each of nsets exports.
+#Each export gets size items, overlap of them from the shared pool. Returns one array for each export.
+def Pools(n, nsets, size, overlap, rng):
+	shared = int(round(size*overlap))
+	own = size - shared
+	if shared + own*nsets > n: raise ValueError("not enough items for "+str(nsets)+" exports of "+str(size))
+
+	order = rng.permutation(n)
+	pools = []
+	for i in range(nsets):
+		pool = np.concatenate([order[:shared], order[shared+own*i:shared+own*(i+1)]])
+		rng.shuffle(pool)
+		pools.append(pool)
+
+	return pools
+
+#Modifications of a peptide in a given row; the same peptide is seen with and without them
+def Mods(seq, row):
+	mods = []
+	if ("S" in seq or "T" in seq) and row % 7 == 0: mods.append("Phospho (ST)")
+	if "M" in seq and row % 3 == 0: mods.append("Oxidation (M)")
+	return "\""+"; ".join(mods)+"\""
+
+#Write a peptide export of rows rows; peptide(k) gives the flanking residues, sequence and protein of peptide k
+def WritePeptides(path, rows, pool, peptide):
+	fout = open(path, "w")
+	fout.write("Header\n\"Search title\",\"Synthetic, benchmark\"\nFormat,\"Mascot, 2.6\"\n\nProtein hits\n")
+	fout.write(",".join(PEPTIDE_HEADER)+"\n")
+
+	for row in range(rows):
+		prev_aa, seq, next_aa, protein = peptide(pool[row % len(pool)])
+		fout.write("%d,1,SYN%06d,\"Protein %d, isoform 1, \"\"synthetic\"\", OS=Homo sapiens\",55.1,12345,3,2,3,2,%d,1,1,1,"
+			"500.2,999.1,2,999.0,0.01,40,0.001,0,%s,%s,%s,%s,\"0.00000\",\"scan, %d\"\n"
+			% (protein+1, protein, protein, row, prev_aa, seq, next_aa, Mods(seq, row), row))
+
+	fout.close()
+
+#Write a protein export of rows rows with the accessions of the proteins in pool
+def WriteProteins(path, rows, pool):
+	fout = open(path, "w")
+	fout.write("Header\n\"Search title\",\"Synthetic, benchmark\"\n\n")
+	fout.write(",".join(PROTEIN_HEADER)+"\n")
+
+	for row in range(rows):
+		protein = pool[row % len(pool)]
+		fout.write("%d,1,SwissProt,SYN%06d,55,12345,\"Protein %d, isoform 1\"\n" % (row+1, protein, protein))
+
+	fout.close()
+
+#Write the inputs of every script to directory, each with rows rows:
+#	Trypsin.csv, TrypN.csv							a Trypsin and a Tryp-N digest of the same sample
+#	TrypN_replicate1.csv ... TrypN_replicate3.csv	three Tryp-N replicates
+#	Trypsin_proteins.csv, TrypN_proteins.csv		protein exports of the two digests
+#	TrypN_proteins1.csv ... TrypN_proteins3.csv		protein exports of the three replicates
+#Returns the paths of the files.
+def WriteAll(directory, rows, overlap=0.5, seed=1):
+	rng = np.random.default_rng(seed+1)
+	size = max(1, rows // PSMS)
+	proteome = Proteome(int(size*(overlap + (1-overlap)*3)) + 1, seed)
+	npeptides = len(proteome.starts)
+	os.makedirs(directory, exist_ok=True)
+	paths = {}
+
+	for name, pool, peptide in zip(["Trypsin", "TrypN"], Pools(npeptides, 2, size, overlap, rng), [proteome.Trypsin, proteome.TrypN]):
+		paths[name] = os.path.join(directory, name+".csv")
+		WritePeptides(paths[name], rows, pool, peptide)
+
+	for i, pool in enumerate(Pools(npeptides, 3, size, overlap, rng)):
+		name = "TrypN_replicate"+str(i+1)
+		paths[name] = os.path.join(directory, name+".csv")
+		WritePeptides(paths[name], rows, pool, proteome.TrypN)
+
+	#Protein exports repeat their proteins if the proteome has fewer proteins than rows
+	nproteins = proteome.nproteins
+	size = max(1, int(nproteins // (overlap + (1-overlap)*3)))
+	names = ["Trypsin_proteins", "TrypN_proteins"]
+	for name, pool in zip(names, Pools(nproteins, 2, size, overlap, rng)):
+		paths[name] = os.path.join(directory, name+".csv")
+		WriteProteins(paths[name], rows, pool)
+
+	for i, pool in enumerate(Pools(nproteins, 3, size, overlap, rng)):
+		name = "TrypN_proteins"+str(i+1)
+		paths[name] = os.path.join(directory, name+".csv")
+		WriteProteins(paths[name], rows, pool)
+
+	return paths
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Write synthetic MASCOT peptide and protein exports.")
+	parser.add_argument("directory", help="directory for the exports")
+	parser.add_argument("--rows", type=int, default=10000, help="rows in each export (default 10000)")
+	parser.add_argument("--overlap", type=float, default=0.5, help="fraction of each export shared with the others of its set (default 0.5)")
+	parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+	args = parser.parse_args()
+
+	for name, path in WriteAll(args.directory, args.rows, args.overlap, args.seed).items():
+		print(path)
@@ -0,0 +1,55 @@
+#This script takes csv files from MASCOT and compares any number of replicate sample preparations.
+#It generalizes comp_peptides_3.py and comp_proteins_3.py to any number of input files.
+#
+#By default this script analyzes PEPTIDES and counts peptides as unique if they have different modifications.
+#With --proteins it analyzes PROTEINS based on accession number (MASCOT protein "Family" exports).
+#With --groups it analyzes the PEPTIDES and their PROTEINS together from one read of each peptide export: the protein
+#overlaps (from the prot_acc column) and the number of peptides of each protein are written as well.
+#
+#Each peptide or protein is given a bitmask of the files it is found in, in a single pass over the files.
+#The output then lists the number found in exactly each combination of files (UpSet-style exclusive
+#intersections), so 30 or more replicates can be compared.
+#
+#Usage: python compare_overlaps.py [--proteins | --groups] [--output overlap_comparison.log] file1.csv file2.csv ...
+#
+#One file will be output with the total for each input and the count of every exclusive intersection
+#(with more than 10 files, only the intersections that hold any peptide or protein are listed).
+#The vector of exclusive intersection counts for R Venn/UpSet plotting is printed.
+#
+#This script uses Python3.
+
+import argparse
+from trypn import external
+from trypn.mascot import ReadPeptides, ReadProteins, ReadPeptideProteins
+from trypn.overlap import CompareFiles
+from trypn.groups import CompareGroups
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Overlap counts among any number of MASCOT csv files.")
+	parser.add_argument("files", nargs="+", help="MASCOT csv files to compare")
+	kinds = parser.add_mutually_exclusive_group()
+	kinds.add_argument("--proteins", action="store_true", help="compare protein accession numbers instead of peptides")
+	kinds.add_argument("--groups", action="store_true", help="compare the peptides and their proteins from one read of each "
+		"peptide file; also writes protein_overlap_comparison.log and protein_groups.log")
+	parser.add_argument("--output", default="overlap_comparison.log", help="output file (default overlap_comparison.log)")
+	parser.add_argument("--memory-budget", type=int, default=external.BUDGET//(1024*1024),
+		help="memory budget in MB; larger inputs are processed in partitions on disk (default TRYPN_MEMORY_BUDGET or 0, no limit)")
+	args = parser.parse_args()
+
+	if args.groups:
+		#One read of each file gives the peptide overlaps (in the output file), the protein overlaps and the protein groups
+		peptides, proteins = CompareGroups(args.files, ReadPeptideProteins, args.output, "protein_overlap_comparison.log",
+			"protein_groups.log", args.memory_budget*1024*1024)
+		print("Vector for R script (peptides):")
+		print(peptides)
+		print("Vector for R script (proteins):")
+		print(proteins)
+	else:
+		if args.proteins: reader = ReadProteins
+		else: reader = ReadPeptides
+
+		#Give each key a bitmask of the files it is found in, count the keys with each bitmask and write the output
+		vector = CompareFiles(args.files, reader, args.output, args.memory_budget*1024*1024)
+
+		print("Vector for R script:")
+		print(vector)
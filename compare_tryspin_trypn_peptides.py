@@ -9,8 +9,8 @@
 #
 #In this version of the script, peptide uniqueness is based on sequence and modification status.
 #
-#Input files should be MASCOT CSV files with peptides in the 24th column (python index 23)
-#and modifications in the 26th column (python index 25).
+#Input files should be MASCOT CSV files. Columns are found by name in the header line (pep_seq, pep_var_mod),
+#otherwise peptides should be in the 24th column (python index 23) and modifications in the 26th column (python index 25).
 #
 #Note: This script assumes that all input peptides are validated as coming from the appropriate enzymes.
 #(i.e. tryptic peptides should end in K/R OR the C-terminus of the protein).  This is the appropriate
@@ -20,158 +20,64 @@
 #if KLEELELDEQQR and KLEELELDEQQK are both present in the same trypsin input file,
 #after trimming, these will result in the same sequence (KLEELELDEQQ). Since we expect these to be
 #rare, this should not significantly affect the analysis, but should be noted. This script
-#will only count one of those instances.
+#will only count one of those instances. Groups of such peptides (of any size) are listed in the summary.
 #
 #Two files will be output:
 #1. The summary table with the number of peptides from each file and number that overlap
 #2. An output file (tab-delimited) that lists all valid peptides, the matching Trypsin peptide(s), and the mathing TrypN peptide(s).
-
-from datetime import datetime
-
-#Function to clean up MASCOT CSV format
-def CleanLine(line):
-	quote = False
-
-	for i in range(len(line)):
-		if quote == False and line[i] == "\"": quote = True
-		elif quote == True and line[i] == "\"": quote = False
-
-		if ((quote == True) and (line[i] == ",")): line = line[:i]+":"+line[i+1:]
-
-	return line
-
-peptides = {}   #dictionary that will contain peptides as keys
-				#and a list [trypsin, trypn] as entries
-
-trypc = set()           #counters for peptides
-trypn = set()
-trypc_KR = set()        #counter for indistinguishable peptides (i.e. those found that end in both K AND R)
-trypn_KR = set()
-
-#I. Build sets for the Tryptic peptides.
-#First, the unique peptide list will be generated.
-#Then the list will be checked for peptides that cannot be distinguished by the other protease.
-
-trypc_file = open("CSV/Trypsin.csv", "r")
-trypc_uniq_peptides = set()
-
-build = False
-for line in trypc_file:      #read in each peptide and make a unique set
-	if line.find("prot_hit") == 0: 
-		build = True
-		line = trypc_file.readline()
-
-	if build == False: continue
-
-	peptide = (CleanLine(line.strip()).split(",")[23], CleanLine(line.strip()).split(",")[25])
-
-	if peptide[1] == "\"\"": peptide = (peptide[0], "None")
-
-	trypc_uniq_peptides.add(peptide)
-
-for peptide in trypc_uniq_peptides:			#Check for indistinguishable peptides
-	if (peptide[0][-1] == "K") and ((peptide[0][:-1]+"R", peptide[1]) in trypc_uniq_peptides): trypc_KR.add(peptide)
-	elif (peptide[0][-1] == "R") and ((peptide[0][:-1]+"K", peptide[1])in trypc_uniq_peptides): trypc_KR.add(peptide)
-
-	if (peptide[0][len(peptide[0])-1] == "K") or (peptide[0][len(peptide[0])-1] == "R"):    #trim C-terminal K/R if needed
-		trimmed = (peptide[0][:-1], peptide[1])
-	else:
-		trimmed = (peptide[0], peptide[1])
-	
-	if trimmed not in peptides:
-		peptides[trimmed] = ["Trypsin", None, [], []]
-
-	peptides[trimmed][2].append(peptide)
-
-trypc_file.close()
-
-
-#II. Build sets for the Tryp-N peptides
-#First, the unique peptide list will be generated.
-#Then the list will be checked for peptides that cannot be distinguished by the other protease.
-
-trypn_file = open("CSV/TrypN.csv", "r")
-trypn_uniq_peptides = set()
-
-build = False
-for line in trypn_file:      #read in each peptide and make a unique set
-	if line.find("prot_hit") == 0: 
-		build = True
-		line = trypn_file.readline()
-
-	if build == False: continue
-
-	peptide = (CleanLine(line.strip()).split(",")[23], CleanLine(line.strip()).split(",")[25])
-
-	if peptide[1] == "\"\"": peptide = (peptide[0], "None")
-
-	trypn_uniq_peptides.add(peptide)
-
-for peptide in trypn_uniq_peptides:			#Check for indistinguishable peptides
-	if (peptide[0][0] == "K") and (("R"+peptide[0][1:], peptide[1]) in trypn_uniq_peptides): trypn_KR.add(peptide)
-	elif (peptide[0][0] == "R") and (("K"+peptide[0][1:], peptide[1]) in trypn_uniq_peptides): trypn_KR.add(peptide)
-
-	if (peptide[0][0] == "K") or (peptide[0][0] == "R"):    #trim N-terminal K/R if needed
-		trimmed = (peptide[0][1:], peptide[1])
-	else:
-		trimmed = (peptide[0], peptide[1])
-
-	if trimmed not in peptides:
-		peptides[trimmed] = [None, "TrypN", [], []]
-	else:
-		peptides[trimmed][1] = "TrypN"
-	
-	peptides[trimmed][3].append(peptide)
-trypn_file.close()
-
-
-#III. Go through the dictionary and count each Venn diagram class
-trypc_only = trypn_only = both = other = 0
-both2 = 0
-for peptide in peptides:
-	if (peptides[peptide][0:2] == ["Trypsin","TrypN"]): both += 1
-	elif (peptides[peptide][0:2] == ["Trypsin", None]): trypc_only += 1
-	elif (peptides[peptide][0:2] == [None,"TrypN"]): trypn_only += 1
-	else: other += 1
-
-
-#IV. Full Comparison Output
-fout = open("peptide_comparison.log", "w+")
-sorted_peptides = sorted(peptides.keys())
-
-for peptide in sorted_peptides:
-	if peptides[peptide][0] == None: tryp_seq = "[None]"
-	else: tryp_seq = str(peptides[peptide][2])
-	
-	if peptides[peptide][1] == None: trypn_seq = "[None]"
-	else: trypn_seq = str(peptides[peptide][3])
-	
-	fout.write(str(peptide)+"\tTrypsin\t"+tryp_seq+"\tTrypN\t"+trypn_seq+"\n")
-fout.close()
+#
+#With --both (python compare_tryspin_trypn_peptides.py --both), the outputs of compare_tryspin_trypn_peptides_no_mods.py
+#are written as well, from the same read of the input files.
+#
+#With --format tsv, the output file has a header line and one column for the Trypsin and one for the TrypN peptides
+#(comma-separated sequences) instead of python lists; with --no-sort, its lines are not sorted. With --format parquet
+#or arrow, the same columns are written as peptide_comparison.parquet or .arrow (see trypn/columnar.py).
+#
+#With --significance, peptide_comparison_significance.log is written as well, with the p-values of the overlap
+#being higher or lower than by chance and its intervals, from permutations (see trypn/significance.py).
+
+import argparse
+from trypn import external
+from trypn.protease import CompareModes, WriteSummary, FORMATS
+
+trypc_file = "CSV/Trypsin.csv"
+trypn_file = "CSV/TrypN.csv"
+
+#I.-IV. Build the unique peptide sets and the trimmed-peptide index for both digests,
+#check for peptides that cannot be distinguished by the other protease,
+#count each Venn diagram class and write the full comparison (see trypn/protease.py).
+#If TRYPN_MEMORY_BUDGET is set, large inputs are compared in partitions on disk (see trypn/external.py).
+parser = argparse.ArgumentParser(description="Compare the peptides of a Trypsin and a Tryp-N digest.")
+parser.add_argument("--both", action="store_true", help="also write the outputs of compare_tryspin_trypn_peptides_no_mods.py")
+parser.add_argument("--format", choices=FORMATS, default="repr", help="format of peptide_comparison.log (default repr)")
+parser.add_argument("--no-sort", action="store_true", help="do not sort peptide_comparison.log")
+parser.add_argument("--significance", action="store_true", help="also write peptide_comparison_significance.log")
+args = parser.parse_args()
+
+if args.format in ("repr", "tsv"): Open, extension = (lambda path: open(path, "w+")), ".log"
+else:
+	from trypn.columnar import ComparisonFile
+	Open, extension = (lambda path: ComparisonFile(path, args.format)), "."+args.format
+
+outputs = {True: Open("peptide_comparison"+extension)}
+if args.both: outputs[False] = Open("peptide_comparison_no_mods"+extension)
+counts = CompareModes(trypc_file, trypn_file, outputs, budget=external.BUDGET, format=args.format, sort=not args.no_sort)
+for fout in outputs.values(): fout.close()
 
 #V. Summary Output
 logfile = open("peptide_comparison_summary.log", "w+")
-print("compare_trypsin_trypn_peptides.py", file = logfile)
-print("Run on", str(datetime.now()), file = logfile)
-
-print("================================", file = logfile)
-print("INPUT FILE SUMMARY", file = logfile)
-print("Number of Tryptic peptides:",len(trypc_uniq_peptides), file = logfile)
-print("Number of TrypN peptides:",len(trypn_uniq_peptides), file = logfile)
-
-print("================================", file = logfile)
-print("OUTPUT STATISTICS", file = logfile)
-print("Number of peptides unique to the Trypsin digest:",trypc_only, file = logfile)
-print("Number of peptides unique to the TrypN digest:",trypn_only, file = logfile)
-print("Number of overlapping peptides:",both, file = logfile)
-print("Number of undistinguishable peptides in Trypsin and TrypN files:",len(trypn_KR)/2,len(trypc_KR)/2, file = logfile)
-
-print("================================", file = logfile)
-print("SANITY CHECK", file = logfile)
-if (len(trypc_uniq_peptides) - len(trypc_KR)/2) == trypc_only + both: print("All Trypsin peptides accounted for. PASS.", file = logfile)
-else: print("Some Trypsin peptides not accounted for. FAIL.", file = logfile)
-if (len(trypn_uniq_peptides) - len(trypn_KR)/2) == trypn_only + both: print("All TrypN peptides accounted for. PASS.", file = logfile)
-else: print("Some TrypN peptides not accounted for. FAIL.", file = logfile)
-if other != 0: print("Some peptides were not properly filtered. Please check the code and input.", file = logfile)
-
-logfile.close()
\ No newline at end of file
+WriteSummary(counts[True], "compare_trypsin_trypn_peptides.py", logfile)
+logfile.close()
+
+if args.both:
+	logfile = open("peptide_comparison_summary_no_mods.log", "w+")
+	WriteSummary(counts[False], "compare_trypsin_trypn_peptides.py --both", logfile)
+	logfile.close()
+
+#VI. Significance of the overlap
+if args.significance:
+	from trypn.overlap import WriteSignificanceFile
+	for mods, name in [(True, "peptide_comparison_significance.log"), (False, "peptide_comparison_significance_no_mods.log")]:
+		if mods not in counts: continue
+		histogram = {1: counts[mods]["trypc_only"], 2: counts[mods]["trypn_only"], 3: counts[mods]["both"]}
+		WriteSignificanceFile(histogram, ["Trypsin", "TrypN"], name)
@@ -0,0 +1,4 @@
+#Shared code for the trypn scripts.
+#
+#The scripts in the top-level directory import from this package to read MASCOT CSV exports,
+#so each parsing step is written once and used everywhere.
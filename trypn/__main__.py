@@ -0,0 +1,5 @@
+#Allows python -m trypn <command> when the package is not installed (see trypn/cli.py)
+
+from trypn.cli import Main
+
+Main()
@@ -0,0 +1,120 @@
+#On-disk cache of the rows extracted from MASCOT CSV files.
+#
+#Parsing a large export takes much longer than loading the few columns the scripts use, so the
+#extracted rows of each file are saved in a compact binary form: a table of the distinct strings
+#and one array of string numbers per column (see EncodeRows in trypn/dictionary.py).
+#
+#Each entry is keyed by the absolute path of the file and the columns extracted from it.
+#An entry is used only if the size and modification time of the file are unchanged. If only the
+#modification time changed (e.g. the file was copied or touched), the content hash is compared instead.
+#
+#The cache directory is bounded in size; the least recently used entries are removed first.
+#Settings are taken from the environment:
+#	TRYPN_CACHE=0			disables the cache
+#	TRYPN_CACHE_DIR		cache directory (default ~/.cache/trypn)
+#	TRYPN_CACHE_SIZE		maximum size of the cache directory in bytes (default 1 GB)
+
+import hashlib
+import marshal
+import os
+from array import array
+
+VERSION = 2
+ENABLED = os.environ.get("TRYPN_CACHE", "1") != "0"
+CACHE_DIR = os.environ.get("TRYPN_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "trypn"))
+CACHE_SIZE = int(os.environ.get("TRYPN_CACHE_SIZE", 1024*1024*1024))
+
+#Hash the content of a file
+def FileDigest(path):
+	digest = hashlib.blake2b(digest_size=20)
+	fin = open(path, "rb")
+	for block in iter(lambda: fin.read(1024*1024), b""):
+		digest.update(block)
+	fin.close()
+	return digest.hexdigest()
+
+#Path of the cache entry for a file and a description of the extracted columns
+def EntryPath(path, key):
+	name = hashlib.blake2b((os.path.abspath(path)+"\0"+key).encode(), digest_size=16).hexdigest()
+	return os.path.join(CACHE_DIR, name+".bin")
+
+#Return the cached (strings, columns) table for a file, or None if there is no valid entry
+def Load(path, key):
+	if not ENABLED: return None
+
+	entry = EntryPath(path, key)
+	try:
+		fin = open(entry, "rb")
+	except OSError:
+		return None
+
+	try:
+		version, size, mtime, digest = marshal.load(fin)
+		stat = os.stat(path)
+		if version != VERSION or stat.st_size != size: return None
+		if stat.st_mtime_ns != mtime and FileDigest(path) != digest: return None
+
+		strings, columns = marshal.load(fin)
+	except (OSError, EOFError, ValueError, TypeError):
+		return None
+	finally:
+		fin.close()
+
+	columns = [array("I", column) for column in columns]
+	if stat.st_mtime_ns != mtime:		#Same content under a new modification time
+		Store(path, key, strings, columns)
+
+	os.utime(entry)						#Mark the entry as recently used
+	return strings, columns
+
+#True if there is a valid entry for a file, without loading it
+def Valid(path, key):
+	if not ENABLED: return False
+
+	try:
+		fin = open(EntryPath(path, key), "rb")
+	except OSError:
+		return False
+
+	try:
+		version, size, mtime, digest = marshal.load(fin)
+		stat = os.stat(path)
+	except (OSError, EOFError, ValueError, TypeError):
+		return False
+	finally:
+		fin.close()
+
+	if version != VERSION or stat.st_size != size: return False
+	return stat.st_mtime_ns == mtime or FileDigest(path) == digest
+
+#Save the (strings, columns) table extracted from a file, then trim the cache to its maximum size
+def Store(path, key, strings, columns):
+	if not ENABLED: return
+
+	entry = EntryPath(path, key)
+	temp = entry+".tmp"+str(os.getpid())
+	try:
+		os.makedirs(CACHE_DIR, exist_ok=True)
+		stat = os.stat(path)
+		fout = open(temp, "wb")
+		marshal.dump((VERSION, stat.st_size, stat.st_mtime_ns, FileDigest(path)), fout)
+		marshal.dump((strings, [column.tobytes() for column in columns]), fout)
+		fout.close()
+		os.replace(temp, entry)
+		Evict()
+	except OSError:						#The cache is optional; a failed write only loses the speedup
+		if os.path.exists(temp): os.remove(temp)
+
+#Remove the least recently used entries until the cache fits in CACHE_SIZE
+def Evict():
+	entries = []
+	for name in os.listdir(CACHE_DIR):
+		if not name.endswith(".bin"): continue
+		stat = os.stat(os.path.join(CACHE_DIR, name))
+		entries.append((stat.st_mtime, stat.st_size, name))
+
+	total = sum([entry[1] for entry in entries])
+	for mtime, size, name in sorted(entries):
+		if total <= CACHE_SIZE: break
+		os.remove(os.path.join(CACHE_DIR, name))
+		total -= size
@@ -0,0 +1,110 @@
+#Parallel reader for single large MASCOT exports.
+#
+#The data rows after the column header line are independent of each other, so a large export is
+#memory-mapped, the column header line is found by a byte scan, and the data section is split into
+#chunks that end at a row boundary. A newline inside a quoted field is not a row boundary: a newline
+#ends a row only if the number of quotes since the start of the chunk is even (an escaped quote "" counts
+#twice, so it does not change this). Each chunk is tokenized with the csv module in a worker process,
+#which returns the distinct rows of its chunk; these are merged in the order of the chunks, so the rows
+#come back in the order of their first occurrence in the file.
+#
+#Repeated rows are only returned once, which does not change any result of the scripts (they count
+#unique peptides and proteins).
+#
+#Settings are taken from the environment:
+#	TRYPN_READ_JOBS		number of worker processes for reading one file (default 1, which reads files serially)
+
+import csv
+import io
+import locale
+import mmap
+import os
+from operator import itemgetter
+
+JOBS = int(os.environ.get("TRYPN_READ_JOBS", "1"))
+MIN_SIZE = 64*1024*1024			#Files smaller than this are read serially
+MIN_CHUNK = 8*1024*1024			#Smallest chunk handed to a worker
+CHUNKS_PER_JOB = 4				#Chunks for each worker, so that workers finishing early can take another
+
+#Open path as a read-only memory map
+def MapFile(path):
+	fin = open(path, "rb")
+	mm = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+	fin.close()
+	return mm
+
+#Find the column header line, which starts with marker.
+#Returns the header line and the offset of the first data row, or ("", size of file) if there is none.
+def FindHeader(path, marker):
+	mm = MapFile(path)
+	marker = marker.encode()
+
+	if mm[:len(marker)] == marker: start = 0
+	else:
+		start = mm.find(b"\n"+marker)
+		if start < 0:
+			size = len(mm)
+			mm.close()
+			return "", size
+		start += 1
+
+	end = mm.find(b"\n", start)
+	if end < 0: end = len(mm)
+	line = mm[start:end].rstrip(b"\r").decode(locale.getpreferredencoding(False))
+	mm.close()
+
+	return line, end+1
+
+#Split the bytes [start, end) of a memory map into row-aligned chunks of at least size bytes.
+#Returns the offsets of the chunk boundaries, including start and end.
+def Boundaries(mm, start, end, size):
+	bounds = [start]
+
+	while bounds[-1] + size < end:
+		last = bounds[-1]
+		target = last + size
+		odd = mm[last:target].count(b"\"") % 2			#Inside a quoted field at target
+
+		newline = mm.find(b"\n", target, end)
+		while newline >= 0:
+			odd = (odd + mm[target:newline].count(b"\"")) % 2
+			if odd == 0: break
+			target = newline
+			newline = mm.find(b"\n", target+1, end)
+
+		if newline < 0 or newline+1 >= end: break
+		bounds.append(newline+1)
+
+	bounds.append(end)
+	return bounds
+
+#Tokenize the rows in bytes [start, end) of path and return the distinct requested columns of each row,
+#in the order of their first occurrence
+def ParseChunk(task):
+	path, start, end, indexes = task
+	mm = MapFile(path)
+	text = mm[start:end].decode(locale.getpreferredencoding(False))
+	mm.close()
+
+	extract = itemgetter(*indexes)
+	return list(dict.fromkeys(map(extract, filter(None, csv.reader(io.StringIO(text, newline=""))))))
+
+#Read the distinct requested columns (python indexes) of the rows from offset start to the end of path,
+#using jobs worker processes. Rows are returned in the order of their first occurrence.
+def ReadDistinct(path, start, indexes, jobs):
+	mm = MapFile(path)
+	end = len(mm)
+	size = max(MIN_CHUNK, (end-start) // (jobs*CHUNKS_PER_JOB) + 1)
+	bounds = Boundaries(mm, start, end, size)
+	mm.close()
+
+	tasks = [(path, bounds[i], bounds[i+1], indexes) for i in range(len(bounds)-1)]
+	seen = set()
+	from concurrent.futures import ProcessPoolExecutor		#Imports multiprocessing, so only for a parallel read
+	executor = ProcessPoolExecutor(max_workers=jobs)
+	for rows in executor.map(ParseChunk, tasks):
+		for row in rows:
+			if row in seen: continue
+			seen.add(row)
+			yield row
+	executor.shutdown()
@@ -0,0 +1,286 @@
+#Cleavage accounting for calc_cleavages.py and trypn cleavages.
+#
+#CountFile determines all cleavage events in one MASCOT file as fixed-size count arrays, so the memory
+#used for the results does not depend on the number of peptides. Files are independent of each other,
+#so CountFiles can hand them to a pool of worker processes; the results are returned in the order
+#of the input files so that the output of a parallel run is identical to a serial run.
+#
+#CountAll merges the results of all files into single arrays (files x ...), and the percentages
+#written by WriteReport are computed from them with array operations.
+#
+#With positions=True, the residues at P4 to P4' of every cleavage site are counted as well. The window of
+#each site is cut from the export as a string of 8 residues, the windows of a file are encoded as small
+#integers (0-19 for the residues of AA, 20 for unknown) in one array, and the counts at each position are
+#found with a single bincount. The exports only give the residue before and after each peptide, so a
+#site before the peptide (prev_aa, then the first residues of seq) has P1 to P4', and a site after it (the last
+#residues of seq, then next_aa) has P4 to P1'; the residues outside the export count as unknown, and the
+#percentages at each position are of the sites whose residue there is known.
+
+from functools import partial
+
+import numpy as np		#numpy is installed with pandas
+
+from trypn import profiler
+from trypn.dictionary import PeptideDictionary
+from trypn.mascot import ReadFile, CleanMod, Prefetch, PEPTIDE_MARKER
+
+AA = ["A", "C", "D", "E", "F", "G", "H", "I", "K", "L", "M", "N", "P", "Q", "R", "S", "T", "V", "W", "Y"]
+RESIDUE = {}			#{amino_acid: python index in AA}
+for each in AA: RESIDUE[each] = len(RESIDUE)
+
+#Columns of the peptide count array
+UNIQUE, INTERNAL, NTERMINAL, CTERMINAL, BOTHTERMINI = range(5)
+
+#Rows of the cleavage count array (the type of peptide the cleavage site comes from)
+SITE_INTERNAL, SITE_NTERMINAL, SITE_CTERMINAL = range(3)
+SITES = ["internal", "N-terminal", "C-terminal"]
+
+#Positions of the window around each cleavage site, which lies between P1 and P1'
+POSITIONS = ["P4", "P3", "P2", "P1", "P1'", "P2'", "P3'", "P4'"]
+FLANK = len(POSITIONS)//2
+
+#Code of each byte of a window: the python index in AA, or len(AA) for unknown residues and "-"
+CODES = np.full(256, len(AA), dtype=np.intp)
+for each in AA: CODES[ord(each)] = RESIDUE[each]
+
+#Determine all cleavage events in one file. Returns two fixed-size count arrays:
+#peptides: the number of unique, internal, N-terminal, C-terminal and both-termini peptides
+#cleavages: the number of cleavages at each P1' amino acid (columns, in the order of AA)
+#for internal, N-terminal and C-terminal peptides (rows)
+#With positions=True, also returns the number of sites with each amino acid at each position of POSITIONS
+#(types of peptide x positions x amino acids)
+def CountFile(path, positions=False):
+	#Skip the header lines preceding the "prot_hit" line, then extract the relevant parts of each line
+	return CountRows(profiler.Rows("rows", ReadFile(path, PEPTIDE_MARKER, ["prev_aa", "seq", "next_aa", "mod"])), positions)
+
+#Window of the site before a peptide: prev_aa, then the first residues of the peptide and next_aa
+def WindowBefore(prev_aa, seq, next_aa):
+	if next_aa == "-": next_aa = ""
+	return "-"*(FLANK-1) + prev_aa + (seq+next_aa+"-"*FLANK)[:FLANK]
+
+#Window of the site after a peptide: the last residues of prev_aa and the peptide, then next_aa
+def WindowAfter(prev_aa, seq, next_aa):
+	if prev_aa == "-": prev_aa = ""
+	return ("-"*FLANK+prev_aa+seq)[-FLANK:] + next_aa + "-"*(FLANK-1)
+
+#Number of windows with each amino acid at each position (positions x amino acids), from an array operation
+#over all the windows at once
+def CountWindows(windows):
+	codes = CODES[np.frombuffer("".join(windows).encode("ascii", "replace"), dtype=np.uint8)]
+	codes += np.tile(np.arange(len(POSITIONS))*(len(AA)+1), len(windows))
+	counts = np.bincount(codes, minlength=len(POSITIONS)*(len(AA)+1)).reshape(len(POSITIONS), len(AA)+1)
+	return counts[:, :len(AA)].astype(np.int64)
+
+#Determine all cleavage events in the (prev_aa, seq, next_aa, mod) rows of a file; see CountFile
+def CountRows(rows, positions=False):
+	dictionary = PeptideDictionary()	#Peptides are held as integer keys
+	all_peptides = set()
+
+	peptides = [0] * 5
+	internal = [0] * len(AA)
+	nterminal = [0] * len(AA)
+	cterminal = [0] * len(AA)
+	windows = [[], [], []]				#Windows of the cleavage sites of each type of peptide, with positions=True
+
+	for prev_aa, seq, next_aa, mod in rows:
+		peptide = dictionary.Encode(seq, CleanMod(mod))		#Define each unique peptide
+		if peptide in all_peptides: continue
+		all_peptides.add(peptide)
+
+		#An internal peptide has cleavages before its first residue and before next_aa
+		if (prev_aa != "-") and (next_aa != "-"):
+			peptides[INTERNAL] += 1
+			internal[RESIDUE[seq[0]]] += 1
+			internal[RESIDUE[next_aa]] += 1
+			if positions:
+				windows[SITE_INTERNAL].append(WindowBefore(prev_aa, seq, next_aa))
+				windows[SITE_INTERNAL].append(WindowAfter(prev_aa, seq, next_aa))
+
+		#An N-terminal peptide only has a cleavage before next_aa
+		elif (prev_aa == "-") and (next_aa != "-"):
+			peptides[NTERMINAL] += 1
+			nterminal[RESIDUE[next_aa]] += 1
+			if positions: windows[SITE_NTERMINAL].append(WindowAfter(prev_aa, seq, next_aa))
+
+		#A C-terminal peptide only has a cleavage before its first residue
+		elif (prev_aa != "-") and (next_aa == "-"):
+			peptides[CTERMINAL] += 1
+			cterminal[RESIDUE[seq[0]]] += 1
+			if positions: windows[SITE_CTERMINAL].append(WindowBefore(prev_aa, seq, next_aa))
+
+		#A peptide that is both N- and C-terminal has no cleavages
+		else:
+			peptides[BOTHTERMINI] += 1
+
+	peptides[UNIQUE] = len(all_peptides)
+	profiler.Count("unique_keys", len(all_peptides))
+
+	counts = np.array(peptides, dtype=np.int64), np.array([internal, nterminal, cterminal], dtype=np.int64)
+	if not positions: return counts
+
+	with profiler.Stage("count positions"):
+		return counts + (np.stack([CountWindows(each) for each in windows]),)
+
+#Count the cleavages in each file, using up to jobs worker processes.
+#Results are yielded in the order of paths as soon as each is available.
+#count is the function that counts one file (e.g. a database run instead of a file; see trypn/database.py).
+def CountFiles(paths, jobs=1, count=CountFile):
+	if jobs <= 1 or len(paths) <= 1:
+		Prefetch(paths)
+		yield from map(count, paths)
+		return
+
+	from concurrent.futures import ProcessPoolExecutor		#Imports multiprocessing, so only for a parallel run
+
+	pool = ProcessPoolExecutor(max_workers=min(jobs, len(paths)))
+	futures = [pool.submit(count, path) for path in paths]
+	try:
+		for future in futures: yield future.result()
+	finally:
+		for future in futures: future.cancel()		#Files not started yet are not counted after an error
+		pool.shutdown(wait=True)
+
+#Count the cleavages in all files and merge the results into two arrays:
+#peptides (files x 5) and cleavages (files x 3 types of peptide x amino acids),
+#and with positions=True a third, positions (files x 3 types of peptide x positions x amino acids).
+#progress is called with each path once the file is done.
+def CountAll(paths, jobs=1, progress=None, count=CountFile, positions=False):
+	if positions: count = partial(count, positions=True)
+
+	results = []
+	for path, counts in zip(paths, CountFiles(paths, jobs, count)):
+		results.append(counts)
+		if progress is not None: progress(path)
+
+	if not paths:
+		shapes = [(5,), (3, len(AA)), (3, len(POSITIONS), len(AA))][:2+positions]
+		return tuple([np.zeros((0,)+shape, dtype=np.int64) for shape in shapes])
+	return tuple([np.stack(each) for each in zip(*results)])
+
+#Total cleavages in each file: internal peptides provide 2, N- and C-terminal peptides each provide 1
+def TotalCleavages(peptides):
+	return peptides[:, INTERNAL]*2 + peptides[:, NTERMINAL] + peptides[:, CTERMINAL]
+
+#Percent of cleavages at each P1' amino acid in each file (files x amino acids)
+def CleavagePercents(peptides, cleavages):
+	return (cleavages.sum(axis=1) / TotalCleavages(peptides)[:, np.newaxis]) * 100
+
+#Percent of the cleavage sites with a known residue at each position that have each amino acid there,
+#in each file (files x positions x amino acids)
+def PositionPercents(positions):
+	counts = positions.sum(axis=1)
+	known = counts.sum(axis=2, keepdims=True)
+	return np.divide(counts, known, out=np.zeros(counts.shape), where=known > 0) * 100
+
+#Percent of cleavages at K, at R, and at all other amino acids in each file (files x 3)
+#Other is summed in the order of AA so it matches a running total exactly
+def KRPercents(percents):
+	other = [RESIDUE[each] for each in AA if each not in ("K", "R")]
+	other_percent = np.cumsum(percents[:, other], axis=1)[:, -1]
+	return np.stack([percents[:, RESIDUE["K"]], percents[:, RESIDUE["R"]], other_percent], axis=1)
+
+#Write the cleavage reports for the files in paths, labelled with names (e.g. the file names):
+#prefix_cleavages.log, prefix_summary.log, prefix_summary2.log and prefix_table.log (see calc_cleavages.py),
+#and the cleavages at each P1' residue as a columnar table to columnar if it is given (see trypn/columnar.py).
+#With positions=True, also prefix_positions.log, the table of prefix_table.log for every position from P4 to P4',
+#and prefix_position_counts.log, the number of sites with each residue at each position for each type of peptide.
+def WriteReport(paths, names, prefix, jobs=1, progress=None, count=CountFile, columnar=None, positions=False):
+	#Go through each file and determine all cleaveage events
+	#Results come back in the order of paths, whether or not they were processed in parallel,
+	#as arrays of peptide counts (files x peptide types) and cleavage counts (files x peptide types x amino acids)
+	with profiler.Stage("count"):
+		peptides, cleavages, *sites = CountAll(paths, jobs, progress, count, positions)
+
+	if positions: WriteCounts(peptides, cleavages, names, prefix, columnar, sites[0])
+	else: WriteCounts(peptides, cleavages, names, prefix, columnar)
+
+#Write the cleavage reports of WriteReport from the counts of each file (as returned by CountAll), labelled with names;
+#prefix_positions.log and prefix_position_counts.log are written if sites, the counts of the positions, is given
+def WriteCounts(peptides, cleavages, names, prefix, columnar=None, sites=None):
+	import pandas as pd
+
+	names_short = []			#Names without their extension; a name without one is kept whole
+	for each in names:
+		if "." in each: each = each[0:each.find(".")]
+		names_short.append(each)
+
+	#Calculate the fraction of cleavages for each amino acid and the K/R/Other summary for all files at once
+	total_cleavages = TotalCleavages(peptides)
+	percents = CleavagePercents(peptides, cleavages)
+	kr_percents = KRPercents(percents)
+
+	summary_df = pd.DataFrame(percents.T, index=AA, columns=names_short)
+
+	#Set up summary output files
+	spec_file = open(prefix+"_summary.log", "w+")
+	print("Filename.csv\tK\tR\tOther", file=spec_file)
+
+	spec_uniq_file = open(prefix+"_summary2.log", "w+")
+	print("Filename.csv\tKR_percent\tunique_peptides", file=spec_uniq_file)
+
+	#Send output to the logfile
+	logfile = open(prefix+"_cleavages.log", "w+")
+	print("Filename.csv", file=logfile)
+	print("P1'_residue\tPercent_cleavages", file=logfile)
+
+	for i in range(len(names)):
+		file = names[i]
+		counts = peptides[i].tolist()
+
+		print("==============================================", file=logfile)
+		print(file, file=logfile)
+
+		for each, aa_percent in zip(AA, percents[i].tolist()):
+			print(each, aa_percent, sep="\t", file=logfile)
+
+		#Output to the main log file
+		print(file, "TOTAL UNIQUE PEPTIDES:", counts[UNIQUE], sep="\t", file=logfile)
+		print(file, "TOTAL CLEAVAGES:", int(total_cleavages[i]), sep="\t", file=logfile)
+		print(file, "N-TERMINAL PEPTIDES:", counts[NTERMINAL], sep="\t", file=logfile)
+		print(file, "INTERNAL PEPTIDES:", counts[INTERNAL], sep="\t", file=logfile)
+		print(file, "C-TERMINAL PEPTIDES:", counts[CTERMINAL], sep="\t", file=logfile)
+		print("==============================================", file=logfile)
+
+		#Output to the KR specificity file
+		K_percent, R_percent, Other_percent = kr_percents[i].tolist()
+		print(file, K_percent, R_percent, Other_percent, sep="\t", file=spec_file)
+
+		#Output to the specificity_unique file
+		print(file, K_percent+R_percent, counts[UNIQUE], sep="\t", file=spec_uniq_file)
+
+	logfile.close()
+	spec_file.close()
+	spec_uniq_file.close()
+
+
+	#Output the data frame for logo plotting in R
+	summary_file = open(prefix+"_table.log", "w+")
+	summary_file.write(summary_df.to_csv(sep="\t"))
+	summary_file.close()
+
+	if sites is not None: WritePositions(sites, names_short, prefix)
+
+	if columnar is not None:
+		from trypn.columnar import WriteColumns
+
+		columns = {"file": [name for name in names for each in AA], "residue": AA*len(names),
+			"cleavages": cleavages.sum(axis=1).ravel().tolist(), "percent": percents.ravel().tolist()}
+		WriteColumns(columns, {"file": "string", "residue": "string", "cleavages": "int64", "percent": "float64"}, columnar)
+
+#Write the residues around the cleavage sites of each file (files x types of peptide x positions x amino acids):
+#prefix_positions.log, the percent of each amino acid at each position (a row for each position and amino acid,
+#a column for each file, as prefix_table.log), and prefix_position_counts.log, the counts for each type of peptide
+def WritePositions(positions, names_short, prefix):
+	import pandas as pd
+
+	index = pd.MultiIndex.from_product([POSITIONS, AA], names=["position", "residue"])
+	percents = PositionPercents(positions).reshape(len(names_short), len(POSITIONS)*len(AA))
+	summary_file = open(prefix+"_positions.log", "w+")
+	summary_file.write(pd.DataFrame(percents.T, index=index, columns=names_short).to_csv(sep="\t"))
+	summary_file.close()
+
+	index = pd.MultiIndex.from_product([SITES, POSITIONS, AA], names=["site", "position", "residue"])
+	counts = positions.reshape(len(names_short), len(SITES)*len(POSITIONS)*len(AA))
+	summary_file = open(prefix+"_position_counts.log", "w+")
+	summary_file.write(pd.DataFrame(counts.T, index=index, columns=names_short).to_csv(sep="\t"))
+	summary_file.close()
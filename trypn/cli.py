@@ -0,0 +1,523 @@
+#Command line entry point: trypn <command> [options] files...
+#
+#	trypn cleavages FILE...				P1' cleavage frequencies (as calc_cleavages.py)
+#	trypn peptides-venn FILE...			peptide overlaps among any number of files (as compare_overlaps.py)
+#	trypn proteins-venn FILE...			protein overlaps among any number of files (as compare_overlaps.py --proteins)
+#	trypn groups-venn FILE...			peptide and protein overlaps and protein groups from one read of peptide exports
+#	trypn protease-compare TRYPSIN TRYPN	Trypsin vs Tryp-N peptides (as compare_tryspin_trypn_peptides.py)
+#	trypn digest-compare ENZYME=FILE...	peptides of any number of digests, each trimmed by the rule of its enzyme
+#	trypn store-add STORE FILE...		add replicates to a membership store, reading only the new files
+#	trypn store-report STORE			overlaps among every file of a membership store
+#	trypn db-load DATABASE FILE...		load exports into a SQLite database of runs
+#	trypn db-runs DATABASE				list the runs of a database
+#	trypn db-find DATABASE				runs that contain a peptide or protein
+#	trypn similarity FILE...			estimated similarity and distinct peptides of many files, from their sketches
+#	trypn watch DIRECTORY				keep the cleavage and overlap reports of the exports in a directory up to date
+#
+#With --database DATABASE, the cleavages, peptides-venn, proteins-venn, groups-venn, protease-compare and similarity commands take
+#runs of the database (names or ids) instead of files.
+#
+#Run trypn <command> --help for the options of each command.
+#
+#Each command imports the modules it needs when it runs, so the commands that do not use pandas
+#or numpy start without paying for importing them.
+#
+#Each command returns the files it wrote, its summary first. With --profile, the timings and counters of
+#the run (see trypn/profiler.py) are written as JSON next to the summary, e.g. peptide_comparison_summary_profile.json.
+
+import argparse
+import os
+import sys
+
+from trypn import chunked, external, profiler
+
+#P1' cleavage frequencies for each file
+def Cleavages(args):
+	from trypn.cleavages import WriteReport
+
+	CheckColumnar(args.columnar)
+	print("Processing", len(args.files), "files...")
+	if args.database is None:
+		names = [os.path.basename(path) for path in args.files]
+		WriteReport(args.files, names, args.prefix, args.jobs, progress=lambda path: print(path, "... DONE"), columnar=args.columnar,
+			positions=args.positions)
+	else:
+		from functools import partial
+		from trypn.database import Database, CountRun
+
+		DatabaseReaders(args, args.files)
+		database = Database(args.database)
+		names = [database.RunName(run) for run in args.files]
+		database.Close()
+		WriteReport(args.files, names, args.prefix, args.jobs, progress=lambda run: print(run, "... DONE"),
+			count=partial(CountRun, args.database), columnar=args.columnar, positions=args.positions)
+
+	outputs = [args.prefix+each for each in ["_summary.log", "_summary2.log", "_cleavages.log", "_table.log"]]
+	if args.positions: outputs += [args.prefix+"_positions.log", args.prefix+"_position_counts.log"]
+	if args.columnar is None: return outputs
+	return outputs+[args.columnar]
+
+#Overlaps among the peptides or proteins of any number of files
+def Venn(args):
+	from trypn.mascot import ReadPeptides, ReadProteins
+	from trypn.overlap import CompareFiles
+
+	budget = args.memory_budget*1024*1024
+	if args.database is None: readers = ReadPeptides, ReadProteins
+	else: readers, budget = DatabaseReaders(args, args.files), 0
+
+	if args.command == "proteins-venn": reader = readers[1]
+	else: reader = readers[0]
+
+	CheckColumnar(args.columnar)
+	SetSignificance(args, len(args.files))
+	try: vector = CompareFiles(args.files, reader, args.output, budget, args.table, args.columnar, args.significance)
+	except ValueError as error: raise SystemExit("trypn "+args.command+": "+str(error))
+	print("Vector for R script:")
+	print(vector)
+
+	return [path for path in [args.output, args.table, args.columnar, args.significance] if path is not None]
+
+#Apply the significance options before any work, for n inputs (see trypn/significance.py)
+def SetSignificance(args, n):
+	if args.significance is None: return
+	from trypn import significance
+
+	if n > significance.MAX_INPUTS:
+		raise SystemExit("trypn "+args.command+": --significance is computed for at most "+str(significance.MAX_INPUTS)+" inputs")
+	if args.permutations is not None: significance.PERMUTATIONS = args.permutations
+	significance.UNIVERSE = args.universe
+
+#Write the significance of the exclusive intersections of a histogram to path; returns path
+def Significance(args, histogram, names, path):
+	from trypn.overlap import WriteSignificanceFile
+
+	try: WriteSignificanceFile(histogram, names, path)
+	except ValueError as error: raise SystemExit("trypn "+args.command+": "+str(error))
+	return path
+
+#Peptide and protein overlaps and protein groups from one read of each peptide export
+def GroupsVenn(args):
+	from trypn.groups import CompareGroups
+	from trypn.mascot import ReadPeptideProteins
+
+	if args.database is None: read, budget = ReadPeptideProteins, args.memory_budget*1024*1024
+	else: read, budget = DatabaseReaders(args, args.files)[2], 0
+
+	peptides, proteins = CompareGroups(args.files, read, args.output, args.proteins_output, args.groups, budget)
+	print("Vector for R script (peptides):")
+	print(peptides)
+	print("Vector for R script (proteins):")
+	print(proteins)
+
+	return [args.output, args.proteins_output, args.groups]
+
+#Exit before any work if a columnar output is asked for (path is not None) and pyarrow is missing
+def CheckColumnar(path):
+	if path is None: return
+	from trypn.columnar import Check
+
+	try: Check(path)
+	except ValueError as error: raise SystemExit("trypn: "+str(error))
+
+#Open the output of a full comparison in format (see trypn/protease.py)
+def OpenComparison(path, format):
+	if format in ("repr", "tsv"): return open(path, "w+")
+
+	from trypn.columnar import ComparisonFile
+
+	CheckColumnar(path)
+	return ComparisonFile(path, format)
+
+#Default name of the full comparison in format: name.log, or name.parquet or name.arrow
+def ComparisonName(name, format):
+	if format in ("repr", "tsv"): return name+".log"
+	return name+"."+format
+
+#Peptide and protein readers of the runs of the database given with --database (see trypn/database.py),
+#after checking that each of runs is in it
+def DatabaseReaders(args, runs):
+	from trypn.database import Database, Readers
+
+	if not os.path.exists(args.database): raise SystemExit("trypn "+args.command+": no database "+args.database)
+	database = Database(args.database)
+	try:
+		for run in runs: database.RunId(run)
+	except ValueError as error: raise SystemExit("trypn "+args.command+": "+str(error))
+	database.Close()
+
+	return Readers(args.database)
+
+#Add _no_mods to the name of a file, before its extension
+def NoModsName(path):
+	root, extension = os.path.splitext(path)
+	return root+"_no_mods"+extension
+
+#Trypsin vs Tryp-N peptide comparison, with or without modifications or both from one read of the files
+def ProteaseCompare(args):
+	from trypn.mascot import ReadPeptides
+	from trypn.protease import CompareModes, WriteSummary
+
+	output = args.output or ComparisonName("peptide_comparison", args.format)
+	summary = args.summary or "peptide_comparison_summary.log"
+
+	files = {}			#{mods: (full comparison, summary)}
+	if args.no_mods:
+		files[False] = (args.output or NoModsName(output), args.summary or NoModsName(summary))
+	else:
+		files[True] = (output, summary)
+		if args.both: files[False] = (NoModsName(output), NoModsName(summary))
+
+	if args.database is None: read, budget = ReadPeptides, args.memory_budget*1024*1024
+	else: read, budget = DatabaseReaders(args, [args.trypsin, args.trypn])[0], 0
+
+	SetSignificance(args, 2)
+	outputs = {mods: OpenComparison(files[mods][0], args.format) for mods in files}
+	counts = CompareModes(args.trypsin, args.trypn, outputs, budget, read, args.format, not args.no_sort)
+
+	for mods in files:
+		outputs[mods].close()
+		logfile = open(files[mods][1], "w+")
+		if mods: WriteSummary(counts[mods], "trypn protease-compare", logfile)
+		else: WriteSummary(counts[mods], "trypn protease-compare --no-mods", logfile)
+		logfile.close()
+
+	written = [files[mods][1] for mods in files] + [files[mods][0] for mods in files]
+	if args.significance is None: return written
+
+	#The Venn classes of the summary: Trypsin only, TrypN only and both
+	for mods in files:
+		histogram = {1: counts[mods]["trypc_only"], 2: counts[mods]["trypn_only"], 3: counts[mods]["both"]}
+		if mods or args.no_mods: path = args.significance
+		else: path = NoModsName(args.significance)
+		written.append(Significance(args, histogram, ["Trypsin", "TrypN"], path))
+	return written
+
+#Peptides of any number of digests, given as ENZYME=FILE
+def DigestCompare(args):
+	from trypn.digests import ParseEnzyme, CompareDigests, WriteSummary
+	from trypn.overlap import VennVector, WriteOverlapColumns
+
+	names, rules, paths = [], [], []
+	for each in args.digests:
+		enzyme, separator, path = each.partition("=")
+		if not separator: raise SystemExit("trypn digest-compare: give each digest as ENZYME=FILE, not \""+each+"\"")
+		try: name, rule = ParseEnzyme(enzyme)
+		except ValueError as error: raise SystemExit("trypn digest-compare: "+str(error))
+		if name in names: raise SystemExit("trypn digest-compare: enzyme name \""+name+"\" is given twice; name a custom rule, e.g. "+name+"2:C:KR")
+		names.append(name)
+		rules.append(rule)
+		paths.append(path)
+	CheckColumnar(args.columnar)
+	SetSignificance(args, len(names))
+
+	output = args.output or ComparisonName("digest_comparison", args.format)
+	fout = OpenComparison(output, args.format)
+	peptides, ambiguous, histogram = CompareDigests(names, rules, paths, fout, not args.no_mods, args.memory_budget*1024*1024, args.format, not args.no_sort)
+	fout.close()
+
+	logfile = open(args.summary, "w+")
+	WriteSummary(names, rules, paths, peptides, ambiguous, histogram, "trypn digest-compare", logfile)
+	logfile.close()
+
+	print("Vector for R script:")
+	print(VennVector(histogram, names))
+
+	written = [args.summary, output]
+	if args.columnar is not None:
+		WriteOverlapColumns(histogram, names, paths, args.columnar)
+		written.append(args.columnar)
+	if args.significance is not None: written.append(Significance(args, histogram, names, args.significance))
+	return written
+
+#Add files to a membership store; files already in the store are skipped
+def StoreAdd(args):
+	from trypn.cache import FileDigest
+	from trypn.mascot import Prefetch
+	from trypn.store import MembershipStore
+
+	kind = None
+	if args.proteins: kind = "proteins"
+	try: store = MembershipStore(args.store, kind)
+	except ValueError as error: raise SystemExit("trypn store-add: "+str(error))
+
+	#Only the files whose content is not in the store yet are read
+	digests = {path: FileDigest(path) for path in args.files}
+	present = set([each[2] for each in store.inputs])
+	Prefetch([path for path in args.files if digests[path] not in present], cached=False)
+	for path in args.files:
+		if store.Add(path, digest=digests[path]): print(path, "... ADDED")
+		else: print(path, "... ALREADY IN STORE")
+	store.Save()
+	print(len(store.inputs), "files,", len(store.masks), store.kind, "in", args.store)
+
+	return [args.store]
+
+#Overlaps among every file of a membership store
+def StoreReport(args):
+	from trypn.store import MembershipStore
+	from trypn.overlap import InputNames, WriteOverlaps, VennVector, WriteOverlapColumns
+
+	if not os.path.exists(args.store): raise SystemExit("trypn store-report: no store "+args.store)
+	CheckColumnar(args.columnar)
+	try: store = MembershipStore(args.store)
+	except ValueError as error: raise SystemExit("trypn store-report: "+str(error))
+
+	names = InputNames(len(store.inputs))
+	SetSignificance(args, len(names))
+	fout = open(args.output, "w+")
+	WriteOverlaps(store.histogram, names, store.Paths(), fout)
+	fout.close()
+
+	print("Vector for R script:")
+	print(VennVector(store.histogram, names))
+
+	written = [args.output]
+	if args.columnar is not None:
+		WriteOverlapColumns(store.histogram, names, store.Paths(), args.columnar)
+		written.append(args.columnar)
+	if args.significance is not None: written.append(Significance(args, store.histogram, names, args.significance))
+	return written
+
+#Load exports into a database; files already in it are skipped
+def DatabaseLoad(args):
+	from trypn.database import Database
+	from trypn.mascot import Prefetch
+
+	kind = "peptides"
+	if args.proteins: kind = "proteins"
+
+	database = Database(args.database)
+	Prefetch(args.files)
+	for path in args.files:
+		run = database.Load(path, kind)
+		if run is None: print(path, "... ALREADY IN DATABASE")
+		else: print(path, "... LOADED AS RUN", run)
+	database.Close()
+
+	return [args.database]
+
+#Print the runs of a database, or those that contain a peptide or protein
+def DatabaseRuns(args):
+	from trypn.database import Database
+
+	if not os.path.exists(args.database): raise SystemExit("trypn "+args.command+": no database "+args.database)
+	database = Database(args.database)
+	if args.command == "db-runs": runs = database.Runs()
+	elif args.peptide is not None: runs = database.RunsWithPeptide(args.peptide, args.mod)
+	else: runs = database.RunsWithProtein(args.protein)
+	database.Close()
+
+	print("id\tname\tpath\tkind\tloaded")
+	for run in runs:
+		print(*run, sep="\t")
+
+#Estimated Jaccard similarity of every pair of files and their distinct and shared peptides or proteins, from
+#the MinHash and HyperLogLog sketch of each file (see trypn/sketch.py)
+def Similarity(args):
+	from trypn.mascot import Prefetch
+	from trypn.overlap import InputNames
+	from trypn.sketch import FileSketch, SketchKeys, WriteSimilarities
+
+	if args.database is None:
+		kind = "peptides"
+		if args.proteins: kind = "proteins"
+		Prefetch(args.files, keys=SketchKeys(kind))
+		sketches = [FileSketch(path, kind) for path in args.files]
+	else:
+		from trypn.database import Database
+
+		DatabaseReaders(args, args.files)
+		database = Database(args.database)
+		sketches = database.RunSketches(args.files)
+		database.Close()
+
+	fout = open(args.output, "w+")
+	with profiler.Stage("similarity"):
+		WriteSimilarities(sketches, InputNames(len(args.files)), args.files, fout)
+	fout.close()
+
+	return [args.output]
+
+#Watch a directory and update the reports as exports are added or changed
+def Watch(args):
+	from trypn.watch import Watcher
+
+	if not os.path.isdir(args.directory): raise SystemExit("trypn watch: no directory "+args.directory)
+	os.makedirs(args.output_dir, exist_ok=True)
+	try: watcher = Watcher(args.directory, args.output_dir, args.prefix)
+	except ValueError as error: raise SystemExit("trypn watch: "+str(error))
+
+	progress = lambda path, done: print(path, "...", done, flush=True)
+	if args.once: return watcher.Scan(args.settle, progress)
+
+	print("Watching", args.directory, "(Ctrl-C to stop)", flush=True)
+	try: watcher.Run(args.interval, args.settle, progress, lambda outputs: print("Updated", *outputs, flush=True))
+	except KeyboardInterrupt: pass
+
+#Build the argument parser with one subparser for each command
+def Parser():
+	parser = argparse.ArgumentParser(prog="trypn", description="Analysis of MASCOT csv files from Trypsin and Tryp-N digests.")
+	commands = parser.add_subparsers(dest="command", required=True, metavar="command")
+	budget = external.BUDGET//(1024*1024)
+
+	#Options of every command
+	common = argparse.ArgumentParser(add_help=False)
+	common.add_argument("--read-jobs", type=int, default=chunked.JOBS,
+		help="worker processes for reading each large file (default TRYPN_READ_JOBS or 1)")
+	common.add_argument("--profile", action="store_true",
+		help="write the time and peak memory of each stage and the counters of the run as JSON next to the summary "
+		"(with _profile.json in place of its extension)")
+	common.add_argument("--profile-file", help="write the --profile report to this file instead")
+	#Options of the commands that count overlaps
+	significance = argparse.ArgumentParser(add_help=False)
+	significance.add_argument("--significance", metavar="FILE",
+		help="also write the p-values and intervals of each overlap class by permutation and bootstrap to this file")
+	significance.add_argument("--permutations", type=int, help="permutations and bootstrap resamples for --significance "
+		"(default TRYPN_PERMUTATIONS or 10000)")
+	significance.add_argument("--universe", type=int,
+		help="number of keys the inputs are drawn from for --significance (default: the keys found in any input)")
+	#Option of the commands that can read runs from a database instead of files
+	database = argparse.ArgumentParser(add_help=False)
+	database.add_argument("--database", help="SQLite database (see trypn db-load); the files given are names or ids of its runs")
+
+	#Options of the commands that write a full comparison
+	comparison = argparse.ArgumentParser(add_help=False)
+	comparison.add_argument("--format", choices=["repr", "tsv", "parquet", "arrow"], default="repr",
+		help="format of the full comparison: repr (python lists of peptides, the default), tsv "
+		"(a header line, then the comma-separated peptides of each digest in a column), or the columns of tsv "
+		"as a typed parquet or arrow table (needs pyarrow)")
+	comparison.add_argument("--no-sort", action="store_true", help="do not sort the full comparison by trimmed peptide")
+
+	columnar_help = "also write the overlap counts as a typed parquet table, or an arrow table if FILE ends in .arrow (needs pyarrow)"
+
+	budget_help = "memory budget in MB; larger inputs are processed in partitions on disk (default TRYPN_MEMORY_BUDGET or 0, no limit)"
+
+	command = commands.add_parser("cleavages", parents=[common, database], help="P1' cleavage frequencies in each file")
+	command.add_argument("files", nargs="+", help="MASCOT peptide csv files")
+	command.add_argument("--prefix", default="prefix", help="prefix for the output files (default prefix)")
+	command.add_argument("--jobs", type=int, default=1, help="number of files to process in parallel (default 1)")
+	command.add_argument("--positions", action="store_true", help="also write the residues at P4 to P4' of the cleavage sites "
+		"(PREFIX_positions.log and PREFIX_position_counts.log)")
+	command.add_argument("--columnar", metavar="FILE", help="also write the cleavages at each P1' residue of each file as a typed "
+		"parquet table, or an arrow table if FILE ends in .arrow (needs pyarrow)")
+	command.set_defaults(run=Cleavages)
+
+	for name, keys in [("peptides-venn", "peptides"), ("proteins-venn", "protein accession numbers")]:
+		command = commands.add_parser(name, parents=[common, database, significance], help="overlaps among the "+keys+" of any number of files")
+		command.add_argument("files", nargs="+", help="MASCOT csv files")
+		command.add_argument("--output", default="overlap_comparison.log", help="output file (default overlap_comparison.log)")
+		command.add_argument("--table", help="also write every one of the "+keys+" with 1/0 for each file to this file")
+		command.add_argument("--columnar", metavar="FILE", help=columnar_help)
+		command.add_argument("--memory-budget", type=int, default=budget, help=budget_help)
+		command.set_defaults(run=Venn)
+
+	command = commands.add_parser("groups-venn", parents=[common, database],
+		help="peptide and protein overlaps and protein groups of any number of peptide files, reading each file once")
+	command.add_argument("files", nargs="+", help="MASCOT peptide csv files")
+	command.add_argument("--output", default="peptide_overlap_comparison.log", help="peptide overlaps (default peptide_overlap_comparison.log)")
+	command.add_argument("--proteins-output", default="protein_overlap_comparison.log",
+		help="protein overlaps, from the proteins of the peptides (default protein_overlap_comparison.log)")
+	command.add_argument("--groups", default="protein_groups.log",
+		help="number of peptides of each protein, unique to it and in each file (default protein_groups.log)")
+	command.add_argument("--memory-budget", type=int, default=budget, help=budget_help)
+	command.set_defaults(run=GroupsVenn)
+
+	command = commands.add_parser("protease-compare", parents=[common, database, comparison, significance], help="compare the peptides of a Trypsin and a Tryp-N digest")
+	command.add_argument("trypsin", help="MASCOT peptide csv file of the Trypsin digest")
+	command.add_argument("trypn", help="MASCOT peptide csv file of the Tryp-N digest")
+	modes = command.add_mutually_exclusive_group()
+	modes.add_argument("--no-mods", action="store_true", help="ignore modifications")
+	modes.add_argument("--both", action="store_true", help="compare with and without modifications from one read of the files; "
+		"the outputs without modifications have _no_mods added to their names")
+	command.add_argument("--output", help="full comparison (default peptide_comparison.log or peptide_comparison_no_mods.log)")
+	command.add_argument("--summary", help="summary (default peptide_comparison_summary.log or peptide_comparison_summary_no_mods.log)")
+	command.add_argument("--memory-budget", type=int, default=budget, help=budget_help)
+	command.set_defaults(run=ProteaseCompare)
+
+	command = commands.add_parser("digest-compare", parents=[common, comparison, significance], help="compare the peptides of any number of digests by enzyme rules")
+	command.add_argument("digests", nargs="+", metavar="ENZYME=FILE",
+		help="MASCOT peptide csv file of each digest with its enzyme: Trypsin, TrypN, LysC, LysN, ArgC, AspN, GluC, "
+		"or a rule NAME:C:RESIDUES (cuts after the residues) or NAME:N:RESIDUES (cuts before them)")
+	command.add_argument("--no-mods", action="store_true", help="ignore modifications")
+	command.add_argument("--output", help="full comparison (default digest_comparison.log, or .parquet or .arrow)")
+	command.add_argument("--columnar", metavar="FILE", help=columnar_help)
+	command.add_argument("--summary", default="digest_comparison_summary.log", help="summary (default digest_comparison_summary.log)")
+	command.add_argument("--memory-budget", type=int, default=budget, help=budget_help)
+	command.set_defaults(run=DigestCompare)
+
+	command = commands.add_parser("store-add", parents=[common], help="add replicates to a membership store, reading only the new files")
+	command.add_argument("store", help="membership store file (created if it does not exist)")
+	command.add_argument("files", nargs="+", help="MASCOT csv files")
+	command.add_argument("--proteins", action="store_true", help="keep protein accession numbers instead of peptides (for a new store)")
+	command.set_defaults(run=StoreAdd)
+
+	command = commands.add_parser("store-report", parents=[common, significance], help="overlaps among every file of a membership store")
+	command.add_argument("store", help="membership store file")
+	command.add_argument("--output", default="overlap_comparison.log", help="output file (default overlap_comparison.log)")
+	command.add_argument("--columnar", metavar="FILE", help=columnar_help)
+	command.set_defaults(run=StoreReport)
+
+	command = commands.add_parser("db-load", parents=[common], help="load exports into a SQLite database of runs")
+	command.add_argument("database", help="SQLite database file (created if it does not exist)")
+	command.add_argument("files", nargs="+", help="MASCOT csv files")
+	command.add_argument("--proteins", action="store_true", help="the files are protein exports")
+	command.set_defaults(run=DatabaseLoad)
+
+	command = commands.add_parser("db-runs", parents=[common], help="list the runs of a database")
+	command.add_argument("database", help="SQLite database file")
+	command.set_defaults(run=DatabaseRuns)
+
+	command = commands.add_parser("db-find", parents=[common], help="runs of a database that contain a peptide or protein")
+	command.add_argument("database", help="SQLite database file")
+	query = command.add_mutually_exclusive_group(required=True)
+	query.add_argument("--peptide", metavar="SEQ", help="peptide sequence")
+	query.add_argument("--protein", metavar="ACCESSION", help="protein accession number")
+	command.add_argument("--mod", help="modifications of the peptide as in the export (default any)")
+	command.set_defaults(run=DatabaseRuns)
+
+	command = commands.add_parser("similarity", parents=[common, database],
+		help="estimated similarity and distinct peptides or proteins of any number of files, from a fixed-size sketch of each")
+	command.add_argument("files", nargs="+", help="MASCOT csv files")
+	command.add_argument("--proteins", action="store_true", help="compare protein accession numbers instead of peptides "
+		"(with --database, each run is compared by its kind)")
+	command.add_argument("--output", default="similarity.log", help="output file (default similarity.log)")
+	command.set_defaults(run=Similarity)
+
+	command = commands.add_parser("watch", parents=[common], help="keep the cleavage and overlap reports of the exports in a directory up to date")
+	command.add_argument("directory", help="directory the MASCOT csv files are written to")
+	command.add_argument("--output-dir", default=".", help="directory of the reports and of the state of the watcher (default .)")
+	command.add_argument("--prefix", default="watch", help="prefix for the reports and the state (default watch)")
+	command.add_argument("--interval", type=float, default=5, help="seconds between scans of the directory (default 5)")
+	command.add_argument("--settle", type=float, default=5,
+		help="seconds a file must be unchanged before it is read, so that files being written are left alone (default 5)")
+	command.add_argument("--once", action="store_true", help="scan the directory once and exit")
+	command.set_defaults(run=Watch)
+
+	return parser
+
+#Run a command; an export that cannot be decompressed ends it with an error naming the file
+def Run(args):
+	from trypn.compressed import DecompressError
+
+	try: return args.run(args)
+	except DecompressError as error: raise SystemExit("trypn "+args.command+": "+str(error))
+
+#Run the command given on the command line (or in argv)
+def Main(argv=None):
+	if argv is None: argv = sys.argv[1:]
+	args = Parser().parse_args(argv)
+	chunked.JOBS = args.read_jobs
+	if not args.profile and args.profile_file is None:
+		Run(args)
+		return
+
+	profiler.Start()
+	outputs = Run(args) or []
+	for path in outputs:
+		profiler.Output(path)
+
+	path = args.profile_file
+	if path is None and outputs: path = os.path.splitext(outputs[0])[0]+"_profile.json"
+	elif path is None: path = "trypn_"+args.command+"_profile.json"
+	profiler.Write(path, ["trypn"]+argv)
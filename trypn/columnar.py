@@ -0,0 +1,109 @@
+#Columnar (Parquet or Arrow IPC) output of the comparison, overlap and cleavage tables.
+#
+#The tables are written with typed columns, so that R (arrow) and pandas load them without parsing text:
+#	full comparison		sequence, mods (with modifications only): string; one list<string> column of peptide
+#						sequences for each digest (see trypn/protease.py and trypn/digests.py)
+#	overlap counts		inputs (e.g. A&B): string, files: list<string>, number_of_inputs and count: int64
+#	cleavages			file and residue: string, cleavages: int64, percent: float64, one row for each
+#						P1' residue of each file
+#
+#The full comparison is written through ComparisonFile, which takes the lines of the tsv format like a text
+#file and writes them as record batches of BATCH rows, so that tables of any size are streamed.
+#
+#Arrow IPC files are written for .arrow, .feather and .ipc paths, Parquet files otherwise. This needs the
+#pyarrow package (pip install pyarrow).
+
+import os
+
+try:
+	import pyarrow as pa
+	import pyarrow.parquet as pq
+except ImportError:			#Only needed for columnar output
+	pa = None
+
+BATCH = 100000				#Rows in each record batch (Parquet row group)
+FORMATS = ["parquet", "arrow"]
+
+#Columnar format of a path by its extension
+def PathFormat(path):
+	if os.path.splitext(path)[1].lower() in (".arrow", ".feather", ".ipc"): return "arrow"
+	return "parquet"
+
+#Raise ValueError if path cannot be written for lack of pyarrow
+def Check(path):
+	if pa is None: raise ValueError("Writing "+path+" needs the pyarrow package (pip install pyarrow)")
+
+#Writer of record batches with schema to path in format (parquet or arrow)
+def OpenWriter(path, schema, format):
+	Check(path)
+	if format == "arrow": return pa.ipc.new_file(path, schema)
+	return pq.ParquetWriter(path, schema)
+
+#Arrow type of each column type name
+def Types():
+	return {"string": pa.string(), "list": pa.list_(pa.string()), "int64": pa.int64(), "float64": pa.float64()}
+
+#Write a table given as {column name: list of values} with {column name: type name} (see Types) to path
+def WriteColumns(columns, types, path, format=None):
+	if format is None: format = PathFormat(path)
+	Check(path)
+
+	schema = pa.schema([pa.field(name, Types()[types[name]]) for name in columns])
+	writer = OpenWriter(path, schema, format)
+	writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+	writer.close()
+
+#File-like writer of the full comparison: takes the lines of the tsv format (a header line, then tab-delimited
+#rows whose columns after sequence and mods are comma-separated lists) and writes them as a columnar table
+class ComparisonFile:
+	def __init__(self, path, format="parquet"):
+		Check(path)
+		self.path = path
+		self.format = format
+		self.names = None		#Column names, from the header line
+		self.writer = None
+		self.pending = ""		#Text after the last newline
+		self.rows = []
+
+	def write(self, text):
+		lines = (self.pending+text).split("\n")
+		self.pending = lines.pop()
+		for line in lines:
+			self.Line(line)
+
+	def writelines(self, lines):
+		self.write("".join(lines))
+
+	def Line(self, line):
+		fields = line.split("\t")
+		if self.names is None:
+			self.names = fields
+			types = {name: "list" for name in fields}
+			for name in ("sequence", "mods"): types[name] = "string"
+			self.schema = pa.schema([pa.field(name, Types()[types[name]]) for name in fields])
+			self.writer = OpenWriter(self.path, self.schema, self.format)
+			return
+
+		self.rows.append(fields)
+		if len(self.rows) >= BATCH: self.Flush()
+
+	#Write the rows received so far as one record batch
+	def Flush(self):
+		if not self.rows: return
+
+		columns = list(zip(*self.rows))
+		arrays = []
+		for i in range(len(self.names)):
+			if self.names[i] in ("sequence", "mods"): arrays.append(pa.array(columns[i], type=pa.string()))
+			else: arrays.append(pa.array([each.split(",") if each else [] for each in columns[i]], type=pa.list_(pa.string())))
+		self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+		self.rows = []
+
+	def close(self):
+		if self.pending: self.Line(self.pending)
+		self.pending = ""
+		if self.writer is None: return
+
+		self.Flush()
+		self.writer.close()
+		self.writer = None
@@ -0,0 +1,141 @@
+#Transparent reading of compressed MASCOT exports.
+#
+#Exports ending in .gz, .bz2, .xz or .zst are decompressed while they are read, without a decompressed copy
+#on disk. The decompression of each file runs on a background thread that stays up to BLOCKS blocks ahead of
+#the parser, so decompressing and parsing overlap (gzip, bz2, lzma and zstandard release the GIL while they
+#decompress). Prefetch starts the threads of the next few files to be read at once, so that they decompress
+#concurrently while the first is parsed; the thread of each further file starts when one of them is opened.
+#The threads of prefetched files that are never opened are stopped when the program exits (see Discard).
+#
+#A file that cannot be decompressed (corrupt or truncated) raises DecompressError, which names the file.
+#
+#.zst files need the zstandard package (pip install zstandard); the other formats use the standard library.
+
+import atexit
+import bz2
+import gzip
+import io
+import locale
+import lzma
+import os
+import queue
+import threading
+
+try:
+	import zstandard
+except ImportError:			#Only needed for .zst files
+	zstandard = None
+
+BLOCK_SIZE = 1024*1024		#Bytes decompressed at a time
+BLOCKS = 16					#Decompressed blocks held ahead of the parser for each file
+RATIO = 5					#Assumed ratio of decompressed to compressed size, for sizing partitions
+PREFETCH_FILES = 4			#Files decompressed ahead at once
+
+PREFETCHED = {}				#{absolute path: Pipe started by Prefetch and not opened yet}
+PENDING = []				#Absolute paths of the files given to Prefetch whose threads have not started
+
+#Error in the content of a compressed file
+class DecompressError(ValueError):
+	pass
+
+#Open the decompressed content of a compressed file as a binary stream
+def OpenBinary(path):
+	extension = os.path.splitext(path)[1].lower()
+	if extension == ".gz": return gzip.open(path, "rb")
+	if extension == ".bz2": return bz2.open(path, "rb")
+	if extension == ".xz": return lzma.open(path, "rb")
+	if extension == ".zst":
+		if zstandard is None: raise ValueError("Reading "+path+" needs the zstandard package (pip install zstandard)")
+		return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+	raise ValueError(path+" is not a compressed file")
+
+#True if path is a compressed file (by its extension)
+def IsCompressed(path):
+	return os.path.splitext(str(path))[1].lower() in (".gz", ".bz2", ".xz", ".zst")
+
+#Size of the content of a file; for a compressed file, an estimate from its compressed size
+def InputSize(path):
+	if IsCompressed(path): return os.path.getsize(path)*RATIO
+	return os.path.getsize(path)
+
+#Binary stream of the decompressed content of a file, filled by a background thread
+class Pipe(io.RawIOBase):
+	def __init__(self, path):
+		self.blocks = queue.Queue(BLOCKS)
+		self.block = memoryview(b"")
+		self.done = False
+		self.error = None
+		self.stop = False
+		self.thread = threading.Thread(target=self.Fill, args=(path,), daemon=True)
+		self.thread.start()
+
+	#Decompress the file into the queue of blocks; None marks the end
+	def Fill(self, path):
+		try:
+			fin = OpenBinary(path)
+			for block in iter(lambda: fin.read(BLOCK_SIZE), b""):
+				if self.stop: break
+				self.blocks.put(block)
+			fin.close()
+		except ValueError as error:		#Raised by OpenBinary, naming the file
+			self.error = str(error)
+		except Exception as error:
+			self.error = "cannot decompress "+path+": "+str(error)
+		self.blocks.put(None)
+
+	def readable(self):
+		return True
+
+	def readinto(self, buffer):
+		if not self.block:
+			if self.done: return 0
+			block = self.blocks.get()
+			if block is None:
+				self.done = True
+				if self.error is not None: raise DecompressError(self.error)
+				return 0
+			self.block = memoryview(block)
+
+		n = min(len(buffer), len(self.block))
+		buffer[:n] = self.block[:n]
+		self.block = self.block[n:]
+		return n
+
+	#Stop the thread if the file is closed before its end
+	def close(self):
+		self.stop = True
+		while not self.done:
+			if self.blocks.get() is None: self.done = True
+		super().close()
+
+#Decompress the compressed files among paths ahead of reading them, on background threads
+def Prefetch(paths):
+	for path in paths:
+		path = os.path.abspath(path)
+		if IsCompressed(path) and path not in PREFETCHED and path not in PENDING: PENDING.append(path)
+	StartPending()
+
+#Stop the threads of the prefetched files that were not opened, and forget the pending files
+def Discard():
+	PENDING.clear()
+	while PREFETCHED:
+		PREFETCHED.popitem()[1].close()
+
+atexit.register(Discard)
+
+#Start the threads of the pending files, up to PREFETCH_FILES files ahead
+def StartPending():
+	while PENDING and len(PREFETCHED) < PREFETCH_FILES:
+		path = PENDING.pop(0)
+		PREFETCHED[path] = Pipe(path)
+
+#Open a file, compressed or not, for reading as text
+def OpenText(path):
+	if not IsCompressed(path): return open(path, "r")
+
+	pipe = PREFETCHED.pop(os.path.abspath(path), None)
+	if pipe is None: pipe = Pipe(path)
+	if os.path.abspath(path) in PENDING: PENDING.remove(os.path.abspath(path))
+	StartPending()
+
+	return io.TextIOWrapper(io.BufferedReader(pipe, BLOCK_SIZE), encoding=locale.getpreferredencoding(False))
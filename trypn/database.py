@@ -0,0 +1,215 @@
+#SQLite database of parsed MASCOT exports, for queries across any number of runs.
+#
+#Each export loaded into the database is a run. Peptides (sequence, modifications) and protein accession
+#numbers are kept once each and referred to by integer ids:
+#	runs				id, name, path, content hash (a file is loaded only once), kind (peptides or proteins), load time
+#	peptides			id, seq, mod (as in the export; "" for no modifications)
+#	proteins			id, accession
+#	peptide_hits		the distinct (peptide, prev_aa, next_aa, protein) rows of each peptide run, in the order of the export
+#	protein_hits		the distinct proteins of each protein run
+#	sketches			MinHash and HyperLogLog sketch of the peptides or proteins of each run (see trypn/sketch.py)
+#
+#The hit tables are indexed by run and by peptide or protein, so the runs that contain a peptide or the
+#overlaps among any selection of runs are found without reading an export again. The readers of a run
+#(Peptides, Proteins, PeptideProteins, PeptideRows) return what the readers in trypn/mascot.py return for its export, so the
+#Venn, cleavage and protease comparisons run on the database with the same code and give the same results.
+#
+#The sketch of a run is built when it is loaded, so the similarity of every pair of runs and their number of
+#distinct peptides or proteins are estimated without reading the hits of any run (see RunSketches).
+#
+#Only distinct rows are kept, which does not change any result (the comparisons count unique peptides and
+#proteins, and the cleavage counts take each peptide at its first row).
+
+import os
+import sqlite3
+from datetime import datetime
+
+from trypn import profiler
+from trypn.cache import FileDigest
+from trypn.mascot import ReadFile, CleanMod, PEPTIDE_MARKER, PROTEIN_MARKER
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, name TEXT NOT NULL, path TEXT NOT NULL,
+	digest TEXT NOT NULL UNIQUE, kind TEXT NOT NULL, loaded TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS peptides (id INTEGER PRIMARY KEY, seq TEXT NOT NULL, mod TEXT NOT NULL, UNIQUE (seq, mod));
+CREATE TABLE IF NOT EXISTS proteins (id INTEGER PRIMARY KEY, accession TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS peptide_hits (run_id INTEGER NOT NULL REFERENCES runs, peptide_id INTEGER NOT NULL REFERENCES peptides,
+	prev_aa TEXT NOT NULL, next_aa TEXT NOT NULL, protein_id INTEGER NOT NULL REFERENCES proteins);
+CREATE TABLE IF NOT EXISTS protein_hits (run_id INTEGER NOT NULL REFERENCES runs, protein_id INTEGER NOT NULL REFERENCES proteins,
+	PRIMARY KEY (run_id, protein_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sketches (run_id INTEGER PRIMARY KEY REFERENCES runs, minhash BLOB NOT NULL, registers BLOB NOT NULL);
+CREATE INDEX IF NOT EXISTS peptides_seq ON peptides (seq);
+CREATE INDEX IF NOT EXISTS peptide_hits_run ON peptide_hits (run_id, peptide_id);
+CREATE INDEX IF NOT EXISTS peptide_hits_peptide ON peptide_hits (peptide_id, run_id);
+CREATE INDEX IF NOT EXISTS peptide_hits_protein ON peptide_hits (protein_id, run_id);
+CREATE INDEX IF NOT EXISTS protein_hits_protein ON protein_hits (protein_id, run_id);
+"""
+
+class Database:
+	#Open the database at path, creating it if it does not exist
+	def __init__(self, path):
+		self.path = path
+		self.connection = sqlite3.connect(path)
+		self.connection.executescript(SCHEMA)
+		self.peptide_ids = None			#{(seq, mod): id}, read when the first file is loaded
+		self.protein_ids = None			#{accession: id}
+
+	def Close(self):
+		self.connection.close()
+
+	#Id of each key in table, adding the keys that are not in it yet. ids is the {key: id} dictionary of the table.
+	def KeyIds(self, keys, table, columns, ids):
+		new = [key for key in dict.fromkeys(keys) if key not in ids]
+		if not new: return
+
+		placeholders = ", ".join(["?"]*len(columns))
+		first = self.connection.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM "+table).fetchone()[0]
+		rows = [(first+i,) + (new[i] if type(new[i]) == tuple else (new[i],)) for i in range(len(new))]
+		self.connection.executemany("INSERT INTO "+table+" (id, "+", ".join(columns)+") VALUES (?, "+placeholders+")", rows)
+		for i in range(len(new)):
+			ids[new[i]] = first+i
+
+	#Load a MASCOT export as a new run named name (default: the file name); kind is "peptides" or "proteins".
+	#Returns the id of the run, or None without changing the database if a file with the same content was loaded before.
+	def Load(self, path, kind="peptides", name=None):
+		digest = FileDigest(path)
+		if self.connection.execute("SELECT id FROM runs WHERE digest = ?", (digest,)).fetchone(): return None
+
+		with self.connection, profiler.Stage("load "+path):
+			cursor = self.connection.execute("INSERT INTO runs (name, path, digest, kind, loaded) VALUES (?, ?, ?, ?, ?)",
+				(name or os.path.basename(path), os.path.abspath(path), digest, kind, str(datetime.now())))
+			run = cursor.lastrowid
+
+			if self.protein_ids is None:
+				self.protein_ids = dict(self.connection.execute("SELECT accession, id FROM proteins"))
+
+			if kind == "proteins":
+				accessions = list(dict.fromkeys(profiler.Rows("rows", ReadFile(path, PROTEIN_MARKER, ["accession"]))))
+				profiler.Count("unique_keys", len(accessions))
+				self.KeyIds(accessions, "proteins", ["accession"], self.protein_ids)
+				self.connection.executemany("INSERT INTO protein_hits (run_id, protein_id) VALUES (?, ?)",
+					[(run, self.protein_ids[each]) for each in accessions])
+				self.StoreSketch(run, accessions)
+				return run
+
+			if self.peptide_ids is None:
+				self.peptide_ids = {(seq, mod): id for id, seq, mod in self.connection.execute("SELECT id, seq, mod FROM peptides")}
+
+			rows = list(dict.fromkeys(profiler.Rows("rows", ReadFile(path, PEPTIDE_MARKER, ["prev_aa", "seq", "next_aa", "mod", "accession"]))))
+			profiler.Count("distinct_rows", len(rows))
+			self.KeyIds([(seq, mod) for prev_aa, seq, next_aa, mod, accession in rows], "peptides", ["seq", "mod"], self.peptide_ids)
+			self.KeyIds([row[4] for row in rows], "proteins", ["accession"], self.protein_ids)
+			self.connection.executemany("INSERT INTO peptide_hits (run_id, peptide_id, prev_aa, next_aa, protein_id) VALUES (?, ?, ?, ?, ?)",
+				[(run, self.peptide_ids[(seq, mod)], prev_aa, next_aa, self.protein_ids[accession]) for prev_aa, seq, next_aa, mod, accession in rows])
+			self.StoreSketch(run, [(seq, CleanMod(mod)) for prev_aa, seq, next_aa, mod, accession in rows])
+
+		return run
+
+	#Save the sketch of the keys of a run (peptides as ReadPeptides, or accession numbers), replacing any old one
+	def StoreSketch(self, run, keys):
+		from trypn.sketch import Sketch, SketchBytes
+
+		with profiler.Stage("sketch"):
+			minhash, registers = SketchBytes(Sketch(keys))
+		self.connection.execute("INSERT OR REPLACE INTO sketches (run_id, minhash, registers) VALUES (?, ?, ?)", (run, minhash, registers))
+
+	#Sketch of each run (see trypn/sketch.py), in the order given. The runs loaded by a version without sketches
+	#are read once and their sketches saved.
+	def RunSketches(self, runs):
+		from trypn.sketch import BytesSketch
+
+		sketches = []
+		for run in runs:
+			run = self.RunId(run)
+			found = self.connection.execute("SELECT minhash, registers FROM sketches WHERE run_id = ?", (run,)).fetchone()
+			if found is None:
+				kind = self.connection.execute("SELECT kind FROM runs WHERE id = ?", (run,)).fetchone()[0]
+				with self.connection:
+					if kind == "proteins": self.StoreSketch(run, self.Proteins(run))
+					else: self.StoreSketch(run, self.Peptides(run))
+				found = self.connection.execute("SELECT minhash, registers FROM sketches WHERE run_id = ?", (run,)).fetchone()
+			sketches.append(BytesSketch(*found))
+
+		return sketches
+
+	#Every run as (id, name, path, kind, loaded), in the order they were loaded
+	def Runs(self):
+		return self.connection.execute("SELECT id, name, path, kind, loaded FROM runs ORDER BY id").fetchall()
+
+	#Id of a run given by its id or its name
+	def RunId(self, run):
+		if str(run).isdigit():
+			found = self.connection.execute("SELECT id FROM runs WHERE id = ?", (int(run),)).fetchall()
+		else:
+			found = self.connection.execute("SELECT id FROM runs WHERE name = ?", (run,)).fetchall()
+
+		if not found: raise ValueError("No run \""+str(run)+"\" in "+self.path)
+		if len(found) > 1: raise ValueError("More than one run is named \""+str(run)+"\" in "+self.path+"; give its id")
+		return found[0][0]
+
+	#Name of a run given by its id or its name
+	def RunName(self, run):
+		return self.connection.execute("SELECT name FROM runs WHERE id = ?", (self.RunId(run),)).fetchone()[0]
+
+	#Runs (as in Runs) that contain a peptide; with mod=None, with any modifications
+	def RunsWithPeptide(self, seq, mod=None):
+		query = "SELECT id, name, path, kind, loaded FROM runs WHERE id IN (SELECT run_id FROM peptide_hits WHERE peptide_id IN " \
+			"(SELECT id FROM peptides WHERE seq = ?"
+		if mod is None: return self.connection.execute(query+")) ORDER BY id", (seq,)).fetchall()
+		return self.connection.execute(query+" AND mod = ?)) ORDER BY id", (seq, mod)).fetchall()
+
+	#Runs (as in Runs) that contain a protein, either in a protein export or as the protein of a peptide
+	def RunsWithProtein(self, accession):
+		return self.connection.execute("SELECT id, name, path, kind, loaded FROM runs WHERE id IN "
+			"(SELECT run_id FROM protein_hits WHERE protein_id = (SELECT id FROM proteins WHERE accession = ?) UNION "
+			"SELECT run_id FROM peptide_hits WHERE protein_id = (SELECT id FROM proteins WHERE accession = ?)) ORDER BY id",
+			(accession, accession)).fetchall()
+
+	#(prev_aa, seq, next_aa, mod) of each distinct row of a peptide run, in the order of the export
+	def PeptideRows(self, run):
+		return self.connection.execute("SELECT prev_aa, seq, next_aa, mod FROM peptide_hits JOIN peptides ON peptides.id = peptide_id "
+			"WHERE run_id = ? ORDER BY peptide_hits.rowid", (self.RunId(run),))
+
+	#Peptide (sequence, modifications) of each row of a peptide run, as ReadPeptides
+	def Peptides(self, run):
+		rows = self.connection.execute("SELECT seq, mod FROM peptides WHERE id IN (SELECT peptide_id FROM peptide_hits WHERE run_id = ?)",
+			(self.RunId(run),))
+		return ((seq, CleanMod(mod)) for seq, mod in rows)
+
+	#Peptide (sequence, modifications) and protein accession number of each row of a peptide run, as ReadPeptideProteins
+	def PeptideProteins(self, run):
+		rows = self.connection.execute("SELECT seq, mod, accession FROM peptide_hits JOIN peptides ON peptides.id = peptide_id "
+			"JOIN proteins ON proteins.id = protein_id WHERE run_id = ?", (self.RunId(run),))
+		return (((seq, CleanMod(mod)), accession) for seq, mod, accession in rows)
+
+	#Accession number of each protein of a protein run (or of the peptides of a peptide run), as ReadProteins
+	def Proteins(self, run):
+		run = self.RunId(run)
+		rows = self.connection.execute("SELECT accession FROM proteins WHERE id IN (SELECT protein_id FROM protein_hits WHERE run_id = ? "
+			"UNION SELECT protein_id FROM peptide_hits WHERE run_id = ?)", (run, run))
+		return (accession for accession, in rows)
+
+#Open the database at path for the readers of a run: returns read(run, cached) functions for peptides, proteins, and
+#peptides with their proteins, which take the place of ReadPeptides, ReadProteins and ReadPeptideProteins in the
+#comparisons (see trypn/overlap.py, trypn/protease.py and trypn/groups.py)
+def Readers(path):
+	return (lambda run, cached=True: RunRows(path, "Peptides", run)), (lambda run, cached=True: RunRows(path, "Proteins", run)), \
+		(lambda run, cached=True: RunRows(path, "PeptideProteins", run))
+
+#Rows of a run given by a reader of Database (e.g. "Peptides"), from a connection to the database at path that is
+#closed once the rows are exhausted or dropped
+def RunRows(path, reader, run):
+	database = Database(path)
+	try:
+		yield from getattr(database, reader)(run)
+	finally:
+		database.Close()
+
+#Count the cleavages of a peptide run in the database at path (see trypn/cleavages.py)
+def CountRun(path, run, positions=False):
+	from trypn.cleavages import CountRows
+
+	database = Database(path)
+	counts = CountRows(database.PeptideRows(run), positions)
+	database.Close()
+	return counts
@@ -0,0 +1,111 @@
+#Integer encoding of peptides.
+#
+#A peptide is identified by its sequence and modifications. Holding it as a tuple of two strings in
+#several sets, lists and dictionaries costs a tuple and two string references every time. Instead,
+#PeptideDictionary gives each distinct sequence and each distinct modification string a number,
+#and a peptide becomes a single integer:
+#	key = (sequence number << MOD_BITS) | modification number
+#Sets, counts and joins then work on integers (and on array("Q") for lists of peptides), and each
+#string is stored once in the dictionary.
+#
+#Rows read from a file are encoded the same way by EncodeRows: each distinct string is kept once
+#in a table and every column becomes an array of 4-byte string numbers. DecodeRows streams the rows
+#back from the table, so the rows of a file are never held in memory as separate tuples and strings.
+
+from array import array
+from collections import defaultdict
+from itertools import islice
+
+MOD_BITS = 20		#Up to about one million distinct modification strings per dictionary
+MOD_MASK = (1 << MOD_BITS) - 1
+
+class PeptideDictionary:
+	def __init__(self):
+		self.seq_ids = {}		#{sequence: number}
+		self.mod_ids = {}		#{modifications: number}
+		self.seqs = []			#Sequence of each number
+		self.mods = []			#Modifications of each number
+
+	#Number of a sequence, adding it if needed
+	def SeqId(self, seq):
+		seq_id = self.seq_ids.get(seq)
+		if seq_id is None:
+			seq_id = self.seq_ids[seq] = len(self.seqs)
+			self.seqs.append(seq)
+		return seq_id
+
+	#Number of a modification string, adding it if needed
+	def ModId(self, mod):
+		mod_id = self.mod_ids.get(mod)
+		if mod_id is None:
+			if len(self.mods) > MOD_MASK: raise OverflowError("Too many distinct modification strings")
+			mod_id = self.mod_ids[mod] = len(self.mods)
+			self.mods.append(mod)
+		return mod_id
+
+	#Key of a peptide, adding its sequence and modifications if needed
+	def Encode(self, seq, mod):
+		return (self.SeqId(seq) << MOD_BITS) | self.ModId(mod)
+
+	#Key of a peptide if both its sequence and modifications are known, otherwise None
+	def Find(self, seq, mod):
+		seq_id = self.seq_ids.get(seq)
+		mod_id = self.mod_ids.get(mod)
+		if seq_id is None or mod_id is None: return None
+		return (seq_id << MOD_BITS) | mod_id
+
+	#Number of a sequence if it is known, otherwise None
+	def FindSeq(self, seq):
+		return self.seq_ids.get(seq)
+
+	#(sequence, modifications) of a key
+	def Decode(self, key):
+		return (self.seqs[key >> MOD_BITS], self.mods[key & MOD_MASK])
+
+	def Sequence(self, key):
+		return self.seqs[key >> MOD_BITS]
+
+	def Mod(self, key):
+		return self.mods[key & MOD_MASK]
+
+	#Key of the same sequence with the modifications "" (for comparisons that ignore modifications)
+	def WithoutMod(self, key):
+		return (key & ~MOD_MASK) | self.ModId("")
+
+	#Encode an iterable of (sequence, modifications) tuples
+	def EncodeAll(self, peptides):
+		encode = self.Encode
+		return (encode(seq, mod) for seq, mod in peptides)
+
+	#Decode an array or list of keys into a list of (sequence, modifications) tuples
+	def DecodeAll(self, keys):
+		return [self.Decode(key) for key in keys]
+
+#Encode rows of ncolumns strings (or single strings if ncolumns is 1) into a table of distinct strings
+#and one array("I") of string numbers per column. Returns (strings, columns).
+def EncodeRows(rows, ncolumns):
+	ids = defaultdict()
+	ids.default_factory = ids.__len__		#A new string gets the next number
+	number = ids.__getitem__
+	columns = [array("I") for i in range(ncolumns)]
+
+	if ncolumns == 1:
+		columns[0].extend(map(number, rows))
+	else:									#Transpose blocks of rows so each column is encoded in one call
+		rows = iter(rows)
+		for block in iter(lambda: list(islice(rows, 65536)), []):
+			for column, values in zip(columns, zip(*block)):
+				column.extend(map(number, values))
+
+	return list(ids), columns
+
+#Iterate over the rows of a (strings, columns) table.
+#A single column is returned as strings, several as tuples.
+def DecodeRows(strings, columns):
+	columns = [map(strings.__getitem__, column) for column in columns]
+	if len(columns) == 1: return columns[0]
+	return zip(*columns)
+
+#Empty array for a list of peptide keys
+def KeyArray(keys=()):
+	return array("Q", keys)
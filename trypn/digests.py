@@ -0,0 +1,282 @@
+#Rule-driven comparison of the peptides of any number of digests.
+#
+#Each enzyme is described by a rule: the terminus of its peptides where it leaves the residue it cuts at,
+#and the residues it cuts at. An enzyme that cuts after K (LysC) leaves K at the C-terminus of its peptides
+#(rule C:K), one that cuts before K (LysN) leaves K at the N-terminus (rule N:K). Trimming that residue
+#gives the sequence between the cleavage sites, which is the same for the peptides of any enzyme that
+#come from the same region of a protein. The peptides of every digest are trimmed by their own rule into
+#one shared index of trimmed keys (trimmed sequence, modifications), reading each file once.
+#
+#Each trimmed key gets a bitmask of the digests it is found in (see trypn/overlap.py), so every per-enzyme
+#and cross-enzyme overlap class is counted at once.
+#
+#Peptides of one digest that have the same trimmed key (e.g. PEPTIDEK and PEPTIDER from a trypsin digest)
+#cannot be told apart in the index; the number of such peptides is reported for each digest, and they are
+#listed as ambiguity groups.
+#
+#The comparison can be made with modifications (peptides are (sequence, modifications)) or without (sequence
+#only); CompareModes makes both from one read of the files, dropping the modifications for the second.
+#The Trypsin vs Tryp-N comparison (see trypn/protease.py) is the case of two digests with the rules C:KR and N:KR.
+#
+#The full comparison is written in one of the formats of trypn/protease.py (repr, tsv, parquet or arrow), sorted by trimmed key
+#unless sorting is turned off.
+#
+#With a memory budget (see trypn/external.py) the peptides are partitioned by trimmed sequence and
+#compared one partition at a time. Every peptide that shares a trimmed sequence is in the same partition,
+#so the counts of the partitions add up to the counts of a run in memory, and the sorted output is identical.
+
+import os
+from collections import Counter
+from datetime import datetime
+
+from trypn import external, profiler
+from trypn.dictionary import PeptideDictionary, KeyArray
+from trypn.mascot import ReadPeptides, Prefetch
+from trypn.overlap import WriteOverlaps
+
+#Rules of the common enzymes: {name: (terminus, residues)}
+ENZYMES = {
+	"Trypsin": ("C", "KR"),
+	"TrypN": ("N", "KR"),
+	"LysC": ("C", "K"),
+	"LysN": ("N", "K"),
+	"ArgC": ("C", "R"),
+	"AspN": ("N", "D"),
+	"GluC": ("C", "E"),
+}
+
+#Parse an enzyme given as a name in ENZYMES or as NAME:TERMINUS:RESIDUES (e.g. AspN:N:DE).
+#Returns (name, rule).
+def ParseEnzyme(spec):
+	parts = spec.split(":")
+	if len(parts) == 1:
+		if spec not in ENZYMES: raise ValueError("Unknown enzyme \""+spec+"\" (known: "+", ".join(ENZYMES)+"); give a rule as NAME:N:RESIDUES or NAME:C:RESIDUES")
+		return spec, ENZYMES[spec]
+
+	if len(parts) != 3 or parts[1] not in ("N", "C") or not parts[0] or not parts[2]:
+		raise ValueError("Enzyme rule \""+spec+"\" should be NAME:N:RESIDUES or NAME:C:RESIDUES")
+	return parts[0], (parts[1], parts[2])
+
+#Function that trims the residue an enzyme leaves at the cleavage site of its peptides, if it is there
+def Trimmer(rule):
+	terminus, residues = rule
+
+	def TrimC(seq):
+		if seq[-1] in residues: return seq[:-1]
+		return seq
+
+	def TrimN(seq):
+		if seq[0] in residues: return seq[1:]
+		return seq
+
+	if terminus == "C": return TrimC
+	return TrimN
+
+#Build the trimmed-key index from the set of unique peptide keys of each digest.
+#Returns the index {trimmed key: [peptides of digest 0, peptides of digest 1, ...]}, where the peptides of a
+#digest are an array of peptide keys or None, and the number of peptides of each digest that share their
+#trimmed key with another peptide of the same digest.
+def BuildIndex(uniq_peptides, rules, dictionary):
+	n = len(uniq_peptides)
+	index = {}
+
+	for i in range(n):
+		trim = Trimmer(rules[i])
+		for peptide in uniq_peptides[i]:
+			seq, mod = dictionary.Decode(peptide)
+			trimmed = dictionary.Encode(trim(seq), mod)
+
+			entry = index.get(trimmed)
+			if entry is None: entry = index[trimmed] = [None]*n
+			if entry[i] is None: entry[i] = KeyArray()
+			entry[i].append(peptide)
+
+	ambiguous = [0]*n
+	for entry in index.values():
+		for i in range(n):
+			if entry[i] is not None and len(entry[i]) > 1: ambiguous[i] += len(entry[i])
+
+	return index, ambiguous
+
+#Count the trimmed keys with each bitmask of digests: {mask: number of trimmed keys}
+def IndexHistogram(index):
+	histogram = Counter()
+	for entry in index.values():
+		mask = 0
+		for i in range(len(entry)):
+			if entry[i] is not None: mask |= 1 << i
+		histogram[mask] += 1
+
+	return histogram
+
+#Ambiguity groups of the index: a list of (digest name, trimmed peptide, peptides) for every trimmed key
+#with more than one peptide of a digest, sorted by trimmed key. With mods=False peptides are given as sequences only.
+def AmbiguityGroups(index, names, dictionary, mods=True):
+	if mods: name = lambda key: dictionary.Decode(key)
+	else: name = dictionary.Sequence
+
+	groups = []
+	for trimmed, entry in index.items():
+		for i in range(len(names)):
+			if entry[i] is not None and len(entry[i]) > 1:
+				groups.append((dictionary.Decode(trimmed), names[i], name(trimmed), sorted([name(each) for each in entry[i]])))
+
+	groups.sort()
+	return [group[1:] for group in groups]
+
+#Sort key (sequence, modifications) and output line for each trimmed key, in sorted order (or, with sort=False,
+#in the order of the index). In the repr format, a line is the trimmed peptide, then the peptides of each digest
+#([None] if there are none), each list after the name of its digest if names is given; in the tsv (and columnar)
+#formats, the trimmed sequence, its modifications (with modifications only), then the comma-separated sequences
+#of the peptides of each digest. The peptides of a digest are sorted. With mods=False peptides are written as sequences only.
+def ComparisonLines(index, dictionary, mods=True, format="repr", sort=True, names=None):
+	if mods: name = lambda key: dictionary.Decode(key)
+	else: name = dictionary.Sequence
+
+	keys = index.keys()
+	if sort: keys = sorted(keys, key=dictionary.Decode)
+
+	for trimmed in keys:
+		if format != "repr":
+			seq, mod = dictionary.Decode(trimmed)
+			out = [seq]
+			if mods: out.append(mod)
+			for peptides in index[trimmed]:
+				if peptides is None: out.append("")
+				else: out.append(",".join(sorted([dictionary.Sequence(each) for each in peptides])))
+			yield dictionary.Decode(trimmed), "\t".join(out)
+			continue
+
+		out = [str(name(trimmed))]
+		for i in range(len(index[trimmed])):
+			peptides = index[trimmed][i]
+			if names is not None: out.append(names[i])
+			if peptides is None: out.append("[None]")
+			else: out.append(str(sorted([name(each) for each in peptides])))
+		yield dictionary.Decode(trimmed), "\t".join(out)
+
+#Sequence-only keys (modifications "") of a set of peptide keys
+def WithoutMods(peptides, dictionary):
+	return set(map(dictionary.WithoutMod, peptides))
+
+#Name of a stage or counter of one mode of the comparison
+def ModeName(name, mods):
+	if mods: return name
+	return name+" (no mods)"
+
+#Index the unique peptide keys of each digest in each of modes (True: with modifications, False: sequence only).
+#Yields (mods, unique peptide keys of each digest, index, indistinguishable peptides of each digest) for each mode
+#(see BuildIndex); the index of each mode must be used before the next mode is indexed.
+def IndexModes(uniq_peptides, rules, dictionary, modes):
+	for mods in sorted(modes, reverse=True):
+		with profiler.Stage(ModeName("index", mods)):
+			if not mods: uniq_peptides = [WithoutMods(each, dictionary) for each in uniq_peptides]
+			index, ambiguous = BuildIndex(uniq_peptides, rules, dictionary)
+		profiler.Count(ModeName("ambiguous_peptides", mods), sum(ambiguous))
+		yield mods, uniq_peptides, index, ambiguous
+
+#Compare the digests given as lists of names, rules (see ParseEnzyme) and paths in each mode of outputs ({mods: file}),
+#reading each file once and writing the full comparison of each mode to its file. Returns {mods: (number of unique
+#peptides of each digest, number of indistinguishable peptides of each digest, histogram of trimmed-key bitmasks,
+#ambiguity groups)}. budget is in bytes; 0 compares in memory. read(path, cached) returns the peptides of a file
+#(see trypn/overlap.py). format is one of the formats of trypn/protease.py; with sort=False the lines are not sorted.
+#With labelled=True each list of peptides of the repr format follows the name of its digest.
+def CompareModes(names, rules, paths, outputs, budget=0, read=ReadPeptides, format="repr", sort=True, labelled=False):
+	if budget and external.PartitionCount(paths, budget) > 1:
+		return ComparePartitioned(names, rules, paths, outputs, budget, read, format, sort, labelled)
+
+	Prefetch(paths)
+	dictionary = PeptideDictionary()
+	uniq_peptides = []
+	for path in paths:
+		with profiler.Stage("read "+str(path)):
+			uniq_peptides.append(set(dictionary.EncodeAll(profiler.Rows("rows", read(path, True)))))
+	profiler.Count("unique_keys", sum([len(each) for each in uniq_peptides]))
+
+	results = {}
+	for mods, mode_peptides, index, ambiguous in IndexModes(uniq_peptides, rules, dictionary, outputs):
+		groups = AmbiguityGroups(index, names, dictionary, mods)
+		profiler.Count(ModeName("ambiguous_groups", mods), len(groups))
+		lines = ComparisonLines(index, dictionary, mods, format, sort, names if labelled else None)
+		with profiler.Stage(ModeName("sort and write", mods)):
+			external.WriteLines(lines, outputs[mods])
+		results[mods] = ([len(each) for each in mode_peptides], ambiguous, IndexHistogram(index), groups)
+
+	return results
+
+#Compare one partition of trimmed sequences at a time; see CompareModes
+def ComparePartitioned(names, rules, paths, outputs, budget, read=ReadPeptides, format="repr", sort=True, labelled=False):
+	nparts = external.PartitionCount(paths, budget)
+	peptides = {mods: [0]*len(paths) for mods in outputs}
+	ambiguous = {mods: [0]*len(paths) for mods in outputs}
+	histogram = {mods: Counter() for mods in outputs}
+	groups = {mods: [] for mods in outputs}
+	runs = {mods: [] for mods in outputs}
+
+	Prefetch(paths, cached=False)
+	with external.TemporaryDirectory() as directory:
+		parts = []
+		for i in range(len(paths)):
+			trim = Trimmer(rules[i])
+			with profiler.Stage("partition "+str(paths[i])):
+				parts.append(external.Partition(profiler.Rows("rows", read(paths[i], False)), nparts, directory, "digest"+str(i),
+					lambda row, trim=trim: trim(row[0])))
+
+		for p in range(nparts):
+			dictionary = PeptideDictionary()
+			with profiler.Stage("read partitions"):
+				uniq_peptides = [set(dictionary.EncodeAll(external.ReadPartition(part[p]))) for part in parts]
+			profiler.Count("unique_keys", sum([len(each) for each in uniq_peptides]))
+			for part in parts: os.remove(part[p])
+
+			for mods, mode_peptides, index, part_ambiguous in IndexModes(uniq_peptides, rules, dictionary, outputs):
+				for i in range(len(paths)):
+					peptides[mods][i] += len(mode_peptides[i])
+					ambiguous[mods][i] += part_ambiguous[i]
+				histogram[mods].update(IndexHistogram(index))
+				part_groups = AmbiguityGroups(index, names, dictionary, mods)
+				profiler.Count(ModeName("ambiguous_groups", mods), len(part_groups))
+				groups[mods].extend(part_groups)
+
+				lines = ComparisonLines(index, dictionary, mods, format, sort, names if labelled else None)
+				with profiler.Stage(ModeName("sort and write runs", mods)):
+					if sort: runs[mods].append(external.WriteRun(lines, directory, "run."+str(int(mods))+"."+str(p)))
+					else: external.WriteLines(lines, outputs[mods])
+
+			del uniq_peptides, mode_peptides, index, dictionary
+
+		for mods in outputs:
+			with profiler.Stage(ModeName("merge runs", mods)):
+				external.MergeRuns(runs[mods], outputs[mods], 2)
+
+	return {mods: (peptides[mods], ambiguous[mods], histogram[mods], sorted(groups[mods], key=lambda group: (group[1], group[0])))
+		for mods in outputs}
+
+#Compare the digests given as lists of names, rules (see ParseEnzyme) and paths, and write the full comparison to fout.
+#Returns the number of unique peptides of each digest, the number of indistinguishable peptides of each digest,
+#and the histogram of trimmed-key bitmasks. budget is in bytes; 0 compares in memory.
+#format is one of the formats of trypn/protease.py; with sort=False the lines are not sorted.
+def CompareDigests(names, rules, paths, fout, mods=True, budget=0, format="repr", sort=True):
+	if format == "repr": fout.write("trimmed_peptide\t"+"\t".join(names)+"\n")
+	elif mods: fout.write("sequence\tmods\t"+"\t".join(names)+"\n")
+	else: fout.write("sequence\t"+"\t".join(names)+"\n")
+
+	peptides, ambiguous, histogram, groups = CompareModes(names, rules, paths, {mods: fout}, budget, ReadPeptides, format, sort)[mods]
+	return peptides, ambiguous, histogram
+
+#Write the summary of a comparison (the results of CompareDigests) to logfile; program is the name in its header
+def WriteSummary(names, rules, paths, peptides, ambiguous, histogram, program, logfile):
+	print(program, file = logfile)
+	print("Run on", str(datetime.now()), file = logfile)
+
+	print("================================", file = logfile)
+	print("INPUT FILE SUMMARY", file = logfile)
+	for i in range(len(names)):
+		terminus, residues = rules[i]
+		print(names[i], paths[i], "rule "+terminus+":"+residues, sep="\t", file = logfile)
+		print("Number of "+names[i]+" peptides:", peptides[i], file = logfile)
+		print("Number of undistinguishable "+names[i]+" peptides:", ambiguous[i], file = logfile)
+
+	print("================================", file = logfile)
+	print("TRIMMED PEPTIDE OVERLAPS", file = logfile)
+	WriteOverlaps(histogram, names, paths, logfile)
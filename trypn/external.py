@@ -0,0 +1,84 @@
+#Out-of-core processing for exports too large to hold in memory.
+#
+#When a memory budget is set, the workflows do not build their sets and dictionaries for all
+#peptides at once. Rows are first spilled to temporary partition files by the hash of their key,
+#so that every row with the same key (e.g. the same trimmed peptide) lands in the same partition.
+#Each partition is then small enough to be deduplicated and joined in memory on its own, and the
+#results of all partitions are added together. Sorted outputs are written as one sorted run per
+#partition and combined by an external k-way merge.
+#
+#Settings are taken from the environment:
+#	TRYPN_MEMORY_BUDGET	memory budget in MB (default 0, which processes everything in memory)
+#	TRYPN_TEMP_DIR		directory for the temporary files (default: the system temporary directory)
+
+import heapq
+import itertools
+import math
+import os
+import tempfile
+import zlib
+
+from trypn import compressed
+
+BUDGET = int(os.environ.get("TRYPN_MEMORY_BUDGET", "0"))*1024*1024
+TEMP_DIR = os.environ.get("TRYPN_TEMP_DIR") or None
+MAX_PARTITIONS = 512		#Limit on the number of partition files open at once
+BATCH = 10000				#Lines written to an output file at once
+
+#Number of partitions for the input files so that one partition fits in budget (bytes).
+#The extracted columns of a row take much less space than the row itself, so sizing partitions by
+#the size of the input files leaves room for the in-memory sets and dictionaries.
+def PartitionCount(paths, budget):
+	size = sum([compressed.InputSize(path) for path in paths])
+	return max(1, min(MAX_PARTITIONS, math.ceil(size/budget)))
+
+#Temporary directory for partitions and runs; removed when the with block ends
+def TemporaryDirectory():
+	return tempfile.TemporaryDirectory(prefix="trypn_", dir=TEMP_DIR)
+
+#Write rows (tuples of strings) into nparts files by the hash of key(row).
+#Rows keep their input order within each partition. Returns the paths of the partition files.
+def Partition(rows, nparts, directory, name, key):
+	paths = [os.path.join(directory, name+"."+str(i)) for i in range(nparts)]
+	files = [open(path, "w") for path in paths]
+	writes = [fout.write for fout in files]
+
+	for row in rows:
+		writes[zlib.crc32(key(row).encode()) % nparts]("\t".join(row)+"\n")
+
+	for fout in files: fout.close()
+	return paths
+
+#Read the rows of a partition file back as tuples of strings
+def ReadPartition(path):
+	fin = open(path, "r")
+	for line in fin:
+		yield tuple(line[:-1].split("\t"))
+	fin.close()
+
+#Write a sorted run: each line is given as (sort key fields, text).
+#Lines must already be sorted by their key fields.
+def WriteRun(lines, directory, name):
+	path = os.path.join(directory, name)
+	fout = open(path, "w")
+	for fields, text in lines:
+		fout.write("\t".join(fields)+"\t"+text+"\n")
+	fout.close()
+	return path
+
+#Write the text of each (fields, text) line to fout, in batches of BATCH lines
+def WriteLines(lines, fout):
+	texts = (text+"\n" for fields, text in lines)
+	batch = list(itertools.islice(texts, BATCH))
+	while batch:
+		fout.writelines(batch)
+		batch = list(itertools.islice(texts, BATCH))
+
+#Merge sorted runs with nkeys key fields into fout, writing only the text of each line
+def MergeRuns(paths, fout, nkeys):
+	files = [open(path, "r") for path in paths]
+
+	for line in heapq.merge(*files, key=lambda line: line.split("\t", nkeys)[:nkeys]):
+		fout.write(line.split("\t", nkeys)[nkeys])
+
+	for fin in files: fin.close()
@@ -0,0 +1,111 @@
+#Peptide and protein overlaps and protein groups from one read of peptide exports.
+#
+#Every row of a MASCOT peptide export carries the accession number of the protein of its peptide (prot_acc),
+#so the peptides, the proteins and the grouping of the peptides under their proteins are all found in a single
+#pass over the export of each replicate, instead of also reading a protein "Family" export. Each peptide and
+#each protein is given a bitmask of the inputs it is found in (see trypn/overlap.py), and each protein counts
+#its distinct peptides, those it does not share with any other protein, and those found in each input.
+#
+#A protein is found in an input if any of its peptides is, so the protein overlaps can differ from those of
+#the Family exports, which list only the protein hits that pass the thresholds of the search.
+#
+#With a memory budget (see trypn/external.py), the rows are partitioned on disk by peptide, so that every
+#protein of a peptide is in its partition. The masks and counts of the proteins, which are far fewer than
+#the peptides, are kept in memory and added up over the partitions.
+
+import os
+from collections import Counter
+
+from trypn import external, profiler
+from trypn.mascot import Prefetch
+from trypn.overlap import MaskHistogram, InputNames, WriteOverlaps, VennVector
+
+#Masks of the (peptide, accession) pairs of each input: peptides {peptide: mask}, proteins {accession: mask},
+#and the proteins of each peptide, groups {peptide: set of accessions}
+def GroupMasks(inputs):
+	peptides, proteins, groups = {}, {}, {}
+	for i in range(len(inputs)):
+		bit = 1 << i
+		for peptide, accession in inputs[i]:
+			peptides[peptide] = peptides.get(peptide, 0) | bit
+			proteins[accession] = proteins.get(accession, 0) | bit
+			group = groups.get(peptide)
+			if group is None: groups[peptide] = {accession}
+			else: group.add(accession)
+
+	return peptides, proteins, groups
+
+#Add the peptides of each protein to counts: {accession: [peptides, unique peptides, peptides in input 0, 1, ...]}
+def CountGroups(peptides, groups, n, counts):
+	for peptide, accessions in groups.items():
+		mask = peptides[peptide]
+		inputs = [i+2 for i in range(n) if mask >> i & 1]
+		for accession in accessions:
+			count = counts.get(accession)
+			if count is None: count = counts[accession] = [0]*(n+2)
+			count[0] += 1
+			if len(accessions) == 1: count[1] += 1
+			for i in inputs: count[i] += 1
+
+#The (peptide, accession) pairs read from each path, one partition (a list of an iterable for each path) at a time
+def PartitionedPairs(paths, read, nparts):
+	if nparts == 1:
+		yield [profiler.Rows("rows", read(path, True)) for path in paths]
+		return
+
+	with external.TemporaryDirectory() as directory:
+		parts = []
+		for i in range(len(paths)):
+			rows = (peptide+(accession,) for peptide, accession in profiler.Rows("rows", read(paths[i], False)))
+			with profiler.Stage("partition "+str(paths[i])):
+				parts.append(external.Partition(rows, nparts, directory, "input"+str(i), lambda row: row[0]+"\t"+row[1]))
+
+		for p in range(nparts):
+			yield [(((seq, mod), accession) for seq, mod, accession in external.ReadPartition(part[p])) for part in parts]
+			for part in parts: os.remove(part[p])
+
+#Overlaps of the peptides and proteins read from each path by read(path, cached), which returns the (peptide, accession)
+#pairs of a file. Returns the histograms of the peptide and protein masks (see trypn/overlap.py) and the protein counts.
+def GroupTables(paths, read, budget=0):
+	nparts = 1
+	if budget: nparts = external.PartitionCount(paths, budget)
+	Prefetch(paths, nparts == 1)
+
+	histogram, proteins, counts = Counter(), {}, {}
+	for inputs in PartitionedPairs(paths, read, nparts):
+		with profiler.Stage("read"):
+			peptides, found, groups = GroupMasks(inputs)
+		profiler.Count("unique_peptides", len(peptides))
+
+		with profiler.Stage("group"):
+			histogram.update(MaskHistogram(peptides))
+			for accession, mask in found.items():
+				proteins[accession] = proteins.get(accession, 0) | mask
+			CountGroups(peptides, groups, len(paths), counts)
+
+	profiler.Count("unique_proteins", len(proteins))
+	return histogram, MaskHistogram(proteins), counts
+
+#Write the protein groups: the number of distinct peptides of each protein, of its peptides not shared with
+#another protein, and of its peptides in each input, tab-delimited and sorted by accession
+def WriteGroups(counts, names, fout):
+	fout.write("accession\tpeptides\tunique_peptides\t"+"\t".join(names)+"\n")
+	fout.writelines([accession+"\t"+"\t".join(map(str, counts[accession]))+"\n" for accession in sorted(counts)])
+
+#Compare the peptides and proteins of the peptide exports at paths and write the peptide overlaps, the protein
+#overlaps and the protein groups. Returns the vectors for the R Venn/UpSet scripts of the peptides and the proteins.
+def CompareGroups(paths, read, peptides_output, proteins_output, groups_output, budget=0):
+	names = InputNames(len(paths))
+	peptides, proteins, counts = GroupTables(paths, read, budget)
+
+	for histogram, output in [(peptides, peptides_output), (proteins, proteins_output)]:
+		logfile = open(output, "w+")
+		WriteOverlaps(histogram, names, paths, logfile)
+		logfile.close()
+
+	with profiler.Stage("write groups"):
+		fout = open(groups_output, "w+")
+		WriteGroups(counts, names, fout)
+		fout.close()
+
+	return VennVector(peptides, names), VennVector(proteins, names)
@@ -0,0 +1,201 @@
+#Reader for MASCOT-generated CSV files.
+#
+#MASCOT exports begin with a header block of search parameters. The data block starts on the line
+#after the column header line, which is found by its first word ("prot_hit" for peptide exports,
+#"Family" for protein exports).
+#
+#Columns are located by name from the column header line, so exports with a different selection
+#or order of columns can be read without changes. Each requested column may be one of the short
+#names in COLUMNS, a column name as written in the header line, or a python index.
+#
+#Rows are tokenized once with the csv module, which handles quoted fields (e.g. protein descriptions
+#containing commas) in linear time. Quotes are removed from the returned fields.
+#
+#ReadFile keeps the columns used by the scripts in the on-disk cache (see trypn/cache.py), so files
+#that are compared repeatedly are only parsed once. trypn similarity sketches a file from the same cached
+#columns (see trypn/sketch.py).
+#
+#With TRYPN_READ_JOBS set, large files are tokenized in chunks by several processes (see trypn/chunked.py);
+#rows repeated within such a file are then only returned once.
+#
+#Compressed exports (.gz, .bz2, .xz, .zst) are decompressed on background threads while they are parsed
+#(see trypn/compressed.py).
+
+import csv
+import os
+from operator import itemgetter
+
+from trypn import cache, chunked, compressed, profiler
+from trypn.dictionary import EncodeRows, DecodeRows
+
+PEPTIDE_MARKER = "prot_hit"		#First word of the column header line in peptide exports
+PROTEIN_MARKER = "Family"		#First word of the column header line in protein exports
+
+#Short names for the columns used by the scripts: {name: (names in the header line, default python index)}
+#The default index is the position in a standard MASCOT export and is used only if the header line names
+#none of these columns; an export that names some of them but not a requested one lacks that column.
+COLUMNS = {
+	"accession": (("prot_acc", "Accession"), 3),
+	"prev_aa": (("pep_res_before",), 22),
+	"seq": (("pep_seq",), 23),
+	"next_aa": (("pep_res_after",), 24),
+	"mod": (("pep_var_mod",), 25),
+}
+
+#Columns kept in the cache for each type of export; requests for any of these share one cache entry
+CACHED_COLUMNS = {
+	PEPTIDE_MARKER: ["prev_aa", "seq", "next_aa", "mod", "accession"],
+	PROTEIN_MARKER: ["accession"],
+}
+
+#Type of a MASCOT export, from the first word of its column header line: PEPTIDE_MARKER, PROTEIN_MARKER,
+#or None if it has neither (e.g. a file that is still being written)
+def ExportKind(path):
+	fin = compressed.OpenText(path)
+	kind = None
+	for line in fin:
+		if line.find(PEPTIDE_MARKER) == 0: kind = PEPTIDE_MARKER
+		elif line.find(PROTEIN_MARKER) == 0: kind = PROTEIN_MARKER
+		else: continue
+		break
+	fin.close()
+	return kind
+
+#Skip the header block and return the column header line as a list of column names
+def ReadHeader(fin, marker):
+	n = 0
+	for line in fin:
+		n += 1
+		if line.find(marker) == 0:
+			profiler.Count("header_lines", n)
+			return next(csv.reader([line]))
+
+	profiler.Count("header_lines", n)
+	return []
+
+#Resolve each requested column to its python index in the column header line
+def ResolveColumns(header, columns):
+	positions = {}
+	for i in range(len(header)):
+		positions.setdefault(header[i].strip(), i)
+
+	named = any([name in positions for names, default in COLUMNS.values() for name in names])
+
+	indexes = []
+	for column in columns:
+		if type(column) == int:
+			indexes.append(column)
+		elif column in positions:
+			indexes.append(positions[column])
+		elif column in COLUMNS:
+			names, default = COLUMNS[column]
+			found = [positions[name] for name in names if name in positions]
+			if found: indexes.append(found[0])
+			elif not named and default < len(header): indexes.append(default)
+			else: raise ValueError("Column \""+column+"\" ("+", ".join(names)+") not found in the MASCOT header line")
+		else:
+			raise ValueError("Column \""+column+"\" not found in the MASCOT header line")
+
+	return indexes
+
+#Build the function that pulls the requested columns out of a tokenized row.
+#A single column is returned as a string, several as a tuple.
+def CompileExtractor(header, columns):
+	return itemgetter(*ResolveColumns(header, columns))
+
+#Skip the header block and return an iterator over the requested columns of each data row
+def ReadRows(fin, marker, columns):
+	header = ReadHeader(fin, marker)
+	extract = CompileExtractor(header, columns)
+
+	return profiler.Rows("data_rows", map(extract, filter(None, csv.reader(fin))))
+
+#Key of the cache entry of the CACHED_COLUMNS of a type of export
+def TableKey(marker):
+	return marker+":"+",".join(CACHED_COLUMNS[marker])
+
+#The (strings, columns) table of the CACHED_COLUMNS of a file from the cache, or parsed and cached; None if the export
+#lacks one of the columns
+def CachedTable(path, marker):
+	key = TableKey(marker)
+	table = cache.Load(path, key)
+	if table is not None:
+		profiler.Count("cache_hits")
+		return table
+
+	profiler.Count("cache_misses")
+	stored = CACHED_COLUMNS[marker]
+	try:
+		table = EncodeRows(StreamFile(path, marker, stored), len(stored))
+	except compressed.DecompressError:
+		raise
+	except ValueError:
+		return None
+	cache.Store(path, key, *table)
+	return table
+
+#Read the requested columns of each data row of a file, using the cache when possible
+def ReadFile(path, marker, columns):
+	stored = CACHED_COLUMNS.get(marker, [])
+	if not cache.ENABLED or not set(columns).issubset(stored):
+		return StreamFile(path, marker, columns)
+
+	table = CachedTable(path, marker)
+	if table is None: return StreamFile(path, marker, columns)		#The export lacks a cached column that was not requested
+
+	strings, stored_columns = table
+	return DecodeRows(strings, [stored_columns[stored.index(column)] for column in columns])
+
+#Read the requested columns of each data row of a file without the cache
+def StreamFile(path, marker, columns):
+	profiler.Count("bytes_read", os.path.getsize(path))
+	if chunked.JOBS > 1 and not compressed.IsCompressed(path) and os.path.getsize(path) >= chunked.MIN_SIZE:
+		yield from ReadChunked(path, marker, columns, chunked.JOBS)
+		return
+
+	fin = compressed.OpenText(path)
+	yield from ReadRows(fin, marker, columns)
+	fin.close()
+
+#Read the distinct requested columns of the data rows of a file with jobs worker processes
+def ReadChunked(path, marker, columns, jobs):
+	line, start = chunked.FindHeader(path, marker)
+	header = []
+	if line: header = next(csv.reader([line]))
+
+	return chunked.ReadDistinct(path, start, ResolveColumns(header, columns), jobs)
+
+#Start decompressing the compressed files among paths that will be parsed (see trypn/compressed.py), so that
+#they decompress concurrently. With cached=True, files with a valid cache entry under one of keys (default the
+#entries of CACHED_COLUMNS) are not parsed.
+def Prefetch(paths, cached=True, keys=None):
+	if keys is None: keys = [TableKey(marker) for marker in CACHED_COLUMNS]
+	for path in paths:
+		if not compressed.IsCompressed(path) or not os.path.exists(path): continue
+		if cached and any([cache.Valid(path, key) for key in keys]): continue
+		compressed.Prefetch([path])
+
+#Convert a modification field to the form used for unique peptides
+def CleanMod(mod):
+	if mod == "": return "None"
+	return mod
+
+#Read the peptide (sequence, modifications) of each data row of a peptide export.
+#With cached=False the file is streamed without the cache.
+def ReadPeptides(path, cached=True):
+	if cached: rows = ReadFile(path, PEPTIDE_MARKER, ["seq", "mod"])
+	else: rows = StreamFile(path, PEPTIDE_MARKER, ["seq", "mod"])
+
+	return ((seq, CleanMod(mod)) for seq, mod in rows)
+
+#Read the peptide (sequence, modifications) and the protein accession number of each data row of a peptide export
+def ReadPeptideProteins(path, cached=True):
+	if cached: rows = ReadFile(path, PEPTIDE_MARKER, ["seq", "mod", "accession"])
+	else: rows = StreamFile(path, PEPTIDE_MARKER, ["seq", "mod", "accession"])
+
+	return (((seq, CleanMod(mod)), accession) for seq, mod, accession in rows)
+
+#Read the accession number of each data row of a protein export
+def ReadProteins(path, cached=True):
+	if cached: return ReadFile(path, PROTEIN_MARKER, ["accession"])
+	return StreamFile(path, PROTEIN_MARKER, ["accession"])
@@ -0,0 +1,212 @@
+#Overlap (Venn/UpSet) counts among any number of peptide or protein sets.
+#
+#Each key (a peptide or a protein accession) is given a membership bitmask in a single pass over
+#the input files: bit i is set if the key is present in file i. The number of keys with each
+#mask is then the number of keys present in exactly that combination of files (an exclusive
+#intersection, as drawn in an UpSet plot). Every other Venn count is a sum over these masks,
+#so no intermediate intersection sets are built regardless of the number of files.
+#
+#With a memory budget (see trypn/external.py), the keys of all inputs are partitioned by hash on disk
+#and the masks are built for one partition at a time. A key is in the same partition for every input,
+#so the histograms of the partitions add up to the histogram of all keys.
+
+import os
+from collections import Counter
+
+from trypn import external, profiler
+from trypn.mascot import Prefetch
+
+MAX_LISTED = 10				#Inputs up to which every exclusive intersection is listed, including those with no keys
+
+#Assign each key a bitmask of the inputs it is found in: {key: mask}
+#inputs is a list of iterables of keys; repeated keys within an input are allowed.
+def MembershipMasks(inputs):
+	masks = {}
+	for i in range(len(inputs)):
+		bit = 1 << i
+		for key in inputs[i]:
+			masks[key] = masks.get(key, 0) | bit
+
+	return masks
+
+#Count the keys with each bitmask: {mask: number of keys}
+def MaskHistogram(masks):
+	return Counter(masks.values())
+
+#Membership masks of the keys read from each path, one partition at a time.
+#read(path, cached) returns the keys of a file (strings or tuples of strings).
+#Without a budget, or if the inputs fit in it, there is a single partition holding every key.
+def PartitionedMasks(paths, read, budget=0):
+	nparts = 1
+	if budget: nparts = external.PartitionCount(paths, budget)
+	Prefetch(paths, nparts == 1)
+
+	if nparts == 1:
+		with profiler.Stage("read"):
+			masks = MembershipMasks([profiler.Rows("rows", read(path, True)) for path in paths])
+		yield masks
+		return
+
+	with external.TemporaryDirectory() as directory:
+		parts = []
+		for i in range(len(paths)):
+			rows = (key if type(key) == tuple else (key,) for key in profiler.Rows("rows", read(paths[i], False)))
+			with profiler.Stage("partition "+str(paths[i])):
+				parts.append(external.Partition(rows, nparts, directory, "input"+str(i), "\t".join))
+
+		for p in range(nparts):
+			inputs = [(row if len(row) > 1 else row[0] for row in external.ReadPartition(part[p])) for part in parts]
+			with profiler.Stage("read partitions"):
+				masks = MembershipMasks(inputs)
+			yield masks
+			for part in parts: os.remove(part[p])
+
+#Count the keys with each bitmask over all partitions: {mask: number of keys}.
+#If fout is given, also write every key with 1/0 for each input, tab-delimited and sorted by key.
+def OverlapTable(paths, read, budget=0, fout=None):
+	histogram = Counter()
+	runs = []
+	nkeys = 1					#Fields of each key: 2 for peptides (sequence, modifications)
+
+	with external.TemporaryDirectory() as directory:
+		for masks in PartitionedMasks(paths, read, budget):
+			histogram.update(MaskHistogram(masks))
+			profiler.Count("unique_keys", len(masks))
+			if fout is None: continue
+
+			for key in masks:
+				if type(key) == tuple: nkeys = len(key)
+				break
+			lines = TableLines(masks, len(paths))
+			with profiler.Stage("sort and write table"):
+				if budget: runs.append(external.WriteRun(lines, directory, "run."+str(len(runs))))
+				else: fout.writelines([text+"\n" for fields, text in lines])
+
+		if runs:
+			with profiler.Stage("merge runs"):
+				external.MergeRuns(runs, fout, nkeys)
+
+	return histogram
+
+#Sort key fields (the fields of the key, so that merged runs are in the order of the sorted keys) and output line
+#(key, then 1/0 for each input) for each key, in sorted order
+def TableLines(masks, n):
+	for key in sorted(masks.keys()):
+		if type(key) == tuple: fields, name = key, str(key)
+		else: fields, name = (key,), key
+		yield fields, name+"\t"+"\t".join([str(masks[key] >> i & 1) for i in range(n)])
+
+#Number of keys present in all inputs of mask (and possibly others)
+def Shared(histogram, mask):
+	return sum([count for each, count in histogram.items() if each & mask == mask])
+
+#Number of keys present in exactly the inputs of mask
+def Exclusive(histogram, mask):
+	return histogram.get(mask, 0)
+
+#Number of keys in input i
+def Total(histogram, i):
+	return Shared(histogram, 1 << i)
+
+#Names of the inputs in mask, e.g. ["A", "C"] for mask 0b101
+def MaskMembers(mask, names):
+	return [names[i] for i in range(len(names)) if mask & (1 << i)]
+
+#Default names for n inputs: A, B, ..., Z, then AA, AB, ...
+def InputNames(n):
+	letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+	names = []
+	for i in range(n):
+		name = ""
+		i += 1
+		while i > 0:
+			i, r = divmod(i-1, 26)
+			name = letters[r]+name
+		names.append(name)
+
+	return names
+
+#All exclusive intersections in a fixed order: by the number of inputs, then by the inputs
+#Returns a list of (mask, count), including combinations with no keys for up to MAX_LISTED inputs
+def ExclusiveCounts(histogram, n):
+	if n > MAX_LISTED:		#2^n combinations would be too many to list; report only those that occur
+		masks = [mask for mask in histogram if mask]
+	else:
+		masks = range(1, 1 << n)
+
+	order = sorted(masks, key=lambda mask: (bin(mask).count("1"), [i for i in range(n) if mask & (1 << i)]))
+	return [(mask, histogram.get(mask, 0)) for mask in order]
+
+#Vector of exclusive intersection counts for the R Venn/UpSet scripts,
+#e.g. A = 1 , B = 2 , "A&B" = 3
+def VennVector(histogram, names):
+	out = []
+	for mask, count in ExclusiveCounts(histogram, len(names)):
+		members = MaskMembers(mask, names)
+		if len(members) == 1: out.append(members[0]+" = "+str(count))
+		else: out.append("\""+"&".join(members)+"\" = "+str(count))
+
+	return " , ".join(out)
+
+#Columns of the exclusive intersections for a columnar table (see trypn/columnar.py): ({name: values}, {name: type})
+def OverlapColumns(histogram, names, filenames):
+	columns = {"inputs": [], "files": [], "number_of_inputs": [], "count": []}
+	for mask, count in ExclusiveCounts(histogram, len(names)):
+		members = MaskMembers(mask, names)
+		columns["inputs"].append("&".join(members))
+		columns["files"].append([str(filenames[i]) for i in range(len(names)) if mask >> i & 1])
+		columns["number_of_inputs"].append(len(members))
+		columns["count"].append(count)
+
+	return columns, {"inputs": "string", "files": "list", "number_of_inputs": "int64", "count": "int64"}
+
+#Write the exclusive intersections as a columnar table to path
+def WriteOverlapColumns(histogram, names, filenames, path):
+	from trypn.columnar import WriteColumns
+
+	WriteColumns(*OverlapColumns(histogram, names, filenames), path)
+
+#Write the overlap table: totals for each input followed by every exclusive intersection
+def WriteOverlaps(histogram, names, filenames, fout):
+	print("TOTALS:", file=fout)
+	for i in range(len(names)):
+		print(names[i], filenames[i], Total(histogram, i), sep="\t", file=fout)
+
+	print("\nEXCLUSIVE INTERSECTIONS:", file=fout)
+	print("inputs\tnumber_of_inputs\tcount", file=fout)
+	for mask, count in ExclusiveCounts(histogram, len(names)):
+		members = MaskMembers(mask, names)
+		print("&".join(members), len(members), count, sep="\t", file=fout)
+
+	print("\nPRESENT IN ALL INPUTS:", Shared(histogram, (1 << len(names))-1), file=fout)
+	print("TOTAL DISTINCT:", sum(histogram.values()), file=fout)
+
+#Write the significance of each exclusive intersection to path (see trypn/significance.py)
+def WriteSignificanceFile(histogram, names, path):
+	from trypn.significance import WriteSignificance
+
+	fout = open(path, "w+")
+	WriteSignificance(histogram, names, fout)
+	fout.close()
+
+#Compare the keys read from each path and write the overlap table to output, if table is given,
+#every key with 1/0 for each input, if columnar is given, the exclusive intersections as a columnar table,
+#and if significance is given, their significance (see trypn/significance.py).
+#Returns the vector for the R Venn/UpSet scripts.
+def CompareFiles(paths, read, output, budget=0, table=None, columnar=None, significance=None):
+	names = InputNames(len(paths))
+
+	if table is None: histogram = OverlapTable(paths, read, budget)
+	else:
+		fout = open(table, "w+")
+		fout.write("id\t"+"\t".join(names)+"\n")
+		histogram = OverlapTable(paths, read, budget, fout)
+		fout.close()
+
+	logfile = open(output, "w+")
+	WriteOverlaps(histogram, names, paths, logfile)
+	logfile.close()
+	if columnar is not None: WriteOverlapColumns(histogram, names, paths, columnar)
+	if significance is not None: WriteSignificanceFile(histogram, names, significance)
+
+	return VennVector(histogram, names)
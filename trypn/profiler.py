@@ -0,0 +1,108 @@
+#Per-stage timing and counters of a run, written as a JSON report (trypn <command> --profile).
+#
+#The stages of a workflow (reading each file, building the index, sorting and writing the comparison, ...)
+#are marked with "with profiler.Stage(name):" and the counters (rows, unique peptides, bytes read, ...) are
+#added with profiler.Count. Both do nothing until Start is called, so a run without --profile pays nothing.
+#
+#A stage that runs more than once (e.g. once for each partition with a memory budget) is reported once with
+#its total time and number of calls.
+#
+#Files are read lazily, so the stage that consumes the rows of a file (e.g. building its set of peptides)
+#includes the parse of the file. For each stage the report gives the wall time and the peak memory of the
+#process (maximum resident set size) at its end; the stage in which the peak grows is the one that
+#needed the memory. Work done in worker processes (--jobs, --read-jobs) is timed, but its counters are not
+#collected.
+#
+#The report holds the command, the stages in the order they first ended, the counters, derived ratios and the
+#size of each output file.
+
+import json
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+	import resource
+except ImportError:			#Not available on Windows; peak memory is then not reported
+	resource = None
+
+ENABLED = False
+STAGES = {}					#{name: {"stage": name, "calls": n, "seconds": total wall time, "peak_mb": peak memory at the end}}
+COUNTERS = Counter()
+OUTPUTS = []				#Files written by the run
+START = None
+
+#Start recording
+def Start():
+	global ENABLED, START
+	ENABLED = True
+	START = time.perf_counter()
+	STAGES.clear()
+	COUNTERS.clear()
+	del OUTPUTS[:]
+
+#Peak memory of the process in MB, or None if it is not available
+def PeakMB():
+	if resource is None: return None
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin": peak = peak/1024		#bytes on macOS, kB elsewhere
+	return round(peak/1024, 1)
+
+#Time the statements in a with block as the stage name
+@contextmanager
+def Stage(name):
+	if not ENABLED:
+		yield
+		return
+
+	start = time.perf_counter()
+	yield
+	stage = STAGES.setdefault(name, {"stage": name, "calls": 0, "seconds": 0})
+	stage["calls"] += 1
+	stage["seconds"] = round(stage["seconds"] + time.perf_counter()-start, 6)
+	stage["peak_mb"] = PeakMB()
+
+#Add n to a counter
+def Count(name, n=1):
+	if ENABLED: COUNTERS[name] += n
+
+#Pass the items of an iterable through, counting them in a counter
+def Rows(name, rows):
+	if not ENABLED: return rows
+	return CountedRows(name, rows)
+
+def CountedRows(name, rows):
+	n = 0
+	for row in rows:
+		n += 1
+		yield row
+	COUNTERS[name] += n
+
+#Record a file written by the run; its size is taken when the report is written
+def Output(path):
+	if ENABLED: OUTPUTS.append(path)
+
+#The report of the run of command (the arguments of the command line)
+def Report(command):
+	counters = dict(COUNTERS)
+	ratios = {}
+	if counters.get("rows"): ratios["dedup"] = round(counters.get("unique_keys", 0)/counters["rows"], 6)
+
+	outputs = {}
+	for path in OUTPUTS:
+		if os.path.exists(path): outputs[path] = os.path.getsize(path)
+	counters["bytes_written"] = sum(outputs.values())
+
+	return {"command": command, "date": str(datetime.now()), "seconds": round(time.perf_counter()-START, 6), "peak_mb": PeakMB(),
+		"stages": list(STAGES.values()), "counters": counters, "ratios": ratios, "outputs": outputs}
+
+#Write the report of the run of command to path as JSON
+def Write(path, command):
+	report = Report(command)
+	fout = open(path, "w+")
+	json.dump(report, fout, indent=1)
+	fout.write("\n")
+	fout.close()
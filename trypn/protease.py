@@ -0,0 +1,112 @@
+#Comparison of peptides from Trypsin and Tryp-N digests.
+#
+#Tryptic peptides end in K/R and Tryp-N peptides begin in K/R. Trimming the C-terminal K/R of a
+#tryptic peptide and the N-terminal K/R of a Tryp-N peptide gives the same trimmed sequence when
+#both come from the same region of a protein, so peptides are matched on their trimmed key
+#(trimmed sequence, modifications). This is the comparison of trypn/digests.py for the two rules
+#Trypsin (C:KR) and TrypN (N:KR), with its own summary.
+#
+#Peptides of one digest that differ only in the trimmed K/R (e.g. KLEELELDEQQR and KLEELELDEQQK) have
+#the same trimmed key, so they cannot be distinguished after trimming. They are found by grouping on the
+#trimmed key, which is the peptide with its terminal K/R masked: every trimmed key with more than one
+#peptide of a digest is an ambiguity group, whatever its size, and the groups are listed in the summary.
+#
+#The comparison can be made with modifications (peptides are (sequence, modifications)) or without
+#(sequence only). CompareBoth reads each file once and builds the index for both from the same set
+#of unique peptides, dropping the modifications for the second.
+#
+#The full comparison is written in one of FORMATS:
+#	repr	each trimmed peptide with the python lists of its Trypsin and Tryp-N peptides (the original format)
+#	tsv		a header line, then the trimmed sequence, its modifications (with modifications only) and the
+#			comma-separated sequences of its Trypsin and Tryp-N peptides (empty if there are none)
+#	parquet, arrow	the columns of the tsv format as a columnar table (see trypn/columnar.py); the output is
+#			then a ComparisonFile, which takes the lines of the tsv format
+#Lines are sorted by trimmed key unless sorting is turned off, and are written in batches (see trypn/external.py).
+#
+#The comparison runs in memory, or with a memory budget (see trypn/external.py) in partitions by trimmed
+#sequence, with identical results (see trypn/digests.py).
+
+from collections import Counter
+from datetime import datetime
+
+from trypn.digests import ENZYMES, CompareModes as CompareDigestModes
+from trypn.mascot import ReadPeptides
+
+FORMATS = ["repr", "tsv", "parquet", "arrow"]
+NAMES = ["Trypsin", "TrypN"]
+
+#Header line of the full comparison in format, or None if it has none
+def Header(format, mods):
+	if format == "repr": return None
+	if mods: return "sequence\tmods\tTrypsin\tTrypN"
+	return "sequence\tTrypsin\tTrypN"
+
+#Counts of the summary from the results of a comparison of the Trypsin and TrypN digests (see CompareModes in
+#trypn/digests.py): the peptides of each digest, the trimmed keys of each Venn diagram class, the ambiguity groups
+#of each digest and the peptides in them; counts["groups"] is the list of ambiguity groups
+def SummaryCounts(peptides, ambiguous, histogram, groups):
+	counts = Counter(trypc_peptides=peptides[0], trypn_peptides=peptides[1],
+		trypc_groups=len([group for group in groups if group[0] == "Trypsin"]), trypn_groups=len([group for group in groups if group[0] == "TrypN"]),
+		trypc_grouped=ambiguous[0], trypn_grouped=ambiguous[1], trypc_only=histogram.get(1, 0), trypn_only=histogram.get(2, 0),
+		both=histogram.get(3, 0), other=sum([count for mask, count in histogram.items() if mask not in (1, 2, 3)]))
+	counts["groups"] = groups
+	return counts
+
+#Compare the peptides of a Trypsin and a Tryp-N file in each mode of outputs ({mods: file}), reading each file once
+#and writing the full comparison of each mode to its file. Returns {mods: counts} (see SummaryCounts).
+#budget is in bytes; 0 compares in memory. read(path, cached) returns the peptides of a file (see trypn/overlap.py).
+#format is one of FORMATS; with sort=False the lines are not sorted.
+def CompareModes(trypc_file, trypn_file, outputs, budget=0, read=ReadPeptides, format="repr", sort=True):
+	for mods in outputs:
+		header = Header(format, mods)
+		if header is not None: outputs[mods].write(header+"\n")
+
+	results = CompareDigestModes(NAMES, [ENZYMES[name] for name in NAMES], [trypc_file, trypn_file], outputs, budget, read,
+		format, sort, labelled=True)
+	return {mods: SummaryCounts(*results[mods]) for mods in results}
+
+#Compare the peptides of a Trypsin and a Tryp-N file, writing the full comparison to fout.
+#Returns the counts for the summary (see SummaryCounts).
+def Compare(trypc_file, trypn_file, fout, mods=True, budget=0):
+	return CompareModes(trypc_file, trypn_file, {mods: fout}, budget)[mods]
+
+#Compare with and without modifications from one read of each file, writing the full comparisons to fout
+#and fout_no_mods. Returns the counts of both.
+def CompareBoth(trypc_file, trypn_file, fout, fout_no_mods, budget=0):
+	counts = CompareModes(trypc_file, trypn_file, {True: fout, False: fout_no_mods}, budget)
+	return counts[True], counts[False]
+
+#Write the summary of a comparison (the counts returned by Compare) to logfile; program is the name in its header
+def WriteSummary(counts, program, logfile):
+	print(program, file = logfile)
+	print("Run on", str(datetime.now()), file = logfile)
+
+	print("================================", file = logfile)
+	print("INPUT FILE SUMMARY", file = logfile)
+	print("Number of Tryptic peptides:",counts["trypc_peptides"], file = logfile)
+	print("Number of TrypN peptides:",counts["trypn_peptides"], file = logfile)
+
+	print("================================", file = logfile)
+	print("OUTPUT STATISTICS", file = logfile)
+	print("Number of peptides unique to the Trypsin digest:",counts["trypc_only"], file = logfile)
+	print("Number of peptides unique to the TrypN digest:",counts["trypn_only"], file = logfile)
+	print("Number of overlapping peptides:",counts["both"], file = logfile)
+
+	#Each ambiguity group is counted once in the classes above, so the peptides it merges are not counted
+	trypc_merged = counts["trypc_grouped"] - counts["trypc_groups"]
+	trypn_merged = counts["trypn_grouped"] - counts["trypn_groups"]
+	print("Number of undistinguishable peptides in Trypsin and TrypN files:",trypc_merged,trypn_merged, file = logfile)
+
+	print("================================", file = logfile)
+	print("UNDISTINGUISHABLE PEPTIDE GROUPS", file = logfile)
+	print("Number of groups in Trypsin and TrypN files:",counts["trypc_groups"],counts["trypn_groups"], file = logfile)
+	for digest, trimmed, members in counts["groups"]:
+		print(digest, trimmed, members, sep = "\t", file = logfile)
+
+	print("================================", file = logfile)
+	print("SANITY CHECK", file = logfile)
+	if counts["trypc_peptides"] - trypc_merged == counts["trypc_only"] + counts["both"]: print("All Trypsin peptides accounted for. PASS.", file = logfile)
+	else: print("Some Trypsin peptides not accounted for. FAIL.", file = logfile)
+	if counts["trypn_peptides"] - trypn_merged == counts["trypn_only"] + counts["both"]: print("All TrypN peptides accounted for. PASS.", file = logfile)
+	else: print("Some TrypN peptides not accounted for. FAIL.", file = logfile)
+	if counts["other"] != 0: print("Some peptides were not properly filtered. Please check the code and input.", file = logfile)
@@ -0,0 +1,112 @@
+#Significance of overlap counts by permutation and bootstrap.
+#
+#Under the null hypothesis the inputs are independent: each input holds a random set of its size drawn from
+#one universe of keys (by default every key found in any input). Permuting the keys of the inputs only changes
+#how many keys end up with each membership bitmask (see trypn/overlap.py), so each permutation is drawn
+#directly as a histogram of masks instead of as sets of keys: the keys of input i are spread over the classes
+#formed by the inputs before it with one hypergeometric draw per class, vectorized over all permutations at
+#once. The cost depends on the number of permutations and of overlap classes, not on the number of keys, so
+#a million peptides take no longer than a hundred.
+#
+#For each exclusive intersection the report gives the observed count, the mean and the 95% interval of the
+#count under the null hypothesis, the p-values of a count higher and lower than by chance (with the add-one
+#correction, so never 0), and a bootstrap 95% confidence interval of the observed count from resampling the
+#keys with replacement (a single multinomial draw for all resamples).
+#
+#Settings are taken from the environment:
+#	TRYPN_PERMUTATIONS	number of permutations and of bootstrap resamples (default 10000)
+#	TRYPN_SEED			seed of the random numbers (default 0, so that a report can be reproduced)
+
+import os
+
+import numpy as np		#numpy is installed with pandas
+
+from trypn import profiler
+from trypn.overlap import ExclusiveCounts, MaskMembers
+
+PERMUTATIONS = int(os.environ.get("TRYPN_PERMUTATIONS", "10000"))
+SEED = int(os.environ.get("TRYPN_SEED", "0"))
+UNIVERSE = None				#Number of possible keys; None for the number of keys found in any input
+LEVEL = 0.95				#Level of the intervals
+MAX_INPUTS = 10				#Each draw holds a count for each of the 2^n classes
+
+#Count of each class of a histogram of n inputs as an array, column mask; mask 0 holds the keys of the
+#universe found in no input
+def HistogramArray(histogram, n, universe=None):
+	counts = np.zeros(1 << n, dtype=np.int64)
+	for mask, count in histogram.items():
+		if mask: counts[mask] = count
+	if universe is not None:
+		if universe < counts.sum(): raise ValueError("The universe ("+str(universe)+") is smaller than the "+str(counts.sum())+" keys found")
+		counts[0] = universe - counts.sum()
+	return counts
+
+#Histograms of masks of inputs of the given sizes drawn at random from a universe of keys:
+#array (permutations x 2^n), column mask
+def NullHistograms(sizes, universe, permutations, rng):
+	counts = np.zeros((permutations, 1 << len(sizes)), dtype=np.int64)
+	counts[:, 0] = universe
+	for i in range(len(sizes)):
+		bit = 1 << i
+		left = np.full(permutations, sizes[i], dtype=np.int64)		#Keys of input i not placed yet
+		rest = np.full(permutations, universe, dtype=np.int64)		#Keys in the classes not drawn from yet
+		for mask in range(bit):
+			rest -= counts[:, mask]
+			drawn = rng.hypergeometric(counts[:, mask], rest, left)
+			counts[:, mask] -= drawn
+			counts[:, mask | bit] = drawn
+			left -= drawn
+
+	return counts
+
+#Histograms of masks of the keys of an observed histogram (as HistogramArray) resampled with replacement:
+#array (resamples x 2^n)
+def BootstrapHistograms(counts, resamples, rng):
+	found = counts.copy()
+	found[0] = 0
+	total = found.sum()
+	if total == 0: return np.zeros((resamples, len(counts)), dtype=np.int64)
+	return rng.multinomial(total, found/total, size=resamples)
+
+#Significance of each exclusive intersection of a histogram of n inputs: a list of
+#(mask, observed, expected, expected low, expected high, p greater, p less, low, high)
+def Significance(histogram, n, universe=None, permutations=None, seed=None):
+	if n > MAX_INPUTS: raise ValueError("Significance is computed for at most "+str(MAX_INPUTS)+" inputs, not "+str(n))
+	if permutations is None: permutations = PERMUTATIONS
+	if seed is None: seed = SEED
+	if universe is None: universe = UNIVERSE
+
+	counts = HistogramArray(histogram, n, universe)
+	universe = int(counts.sum())
+	masks = np.arange(1 << n)
+	sizes = [int(counts[masks & (1 << i) > 0].sum()) for i in range(n)]
+
+	rng = np.random.default_rng(seed)
+	with profiler.Stage("permutations"):
+		null = NullHistograms(sizes, universe, permutations, rng)
+	with profiler.Stage("bootstrap"):
+		resampled = BootstrapHistograms(counts, permutations, rng)
+	profiler.Count("permutations", permutations)
+
+	tails = [(1-LEVEL)/2*100, (1+LEVEL)/2*100]
+	expected_low, expected_high = np.percentile(null, tails, axis=0)
+	low, high = np.percentile(resampled, tails, axis=0)
+	greater = (1 + (null >= counts).sum(axis=0)) / (permutations + 1)
+	less = (1 + (null <= counts).sum(axis=0)) / (permutations + 1)
+	expected = null.mean(axis=0)
+
+	rows = []
+	for mask, count in ExclusiveCounts(histogram, n):
+		rows.append((mask, int(counts[mask]), round(float(expected[mask]), 2), round(float(expected_low[mask]), 2),
+			round(float(expected_high[mask]), 2), float(greater[mask]), float(less[mask]), round(float(low[mask]), 2), round(float(high[mask]), 2)))
+	return rows
+
+#Write the significance of each exclusive intersection of a histogram, tab-delimited
+def WriteSignificance(histogram, names, fout, universe=None, permutations=None, seed=None):
+	rows = Significance(histogram, len(names), universe, permutations, seed)
+	if permutations is None: permutations = PERMUTATIONS
+
+	print("SIGNIFICANCE OF EXCLUSIVE INTERSECTIONS:", permutations, "permutations and bootstrap resamples", file=fout)
+	print("inputs\tcount\texpected\texpected_low\texpected_high\tp_greater\tp_less\tci_low\tci_high", file=fout)
+	for mask, *values in rows:
+		print("&".join(MaskMembers(mask, names)), *values, sep="\t", file=fout)
@@ -0,0 +1,222 @@
+#MinHash and HyperLogLog sketches of the peptides or proteins of a run, for similarity across many runs.
+#
+#Each key (a peptide (sequence, modifications), or a protein accession) is hashed to 64 bits. The sketch
+#of a run is fixed in size however many keys it has:
+#	MinHash		the MINHASH_SIZE smallest hashes of the run (a bottom-k sketch). The Jaccard similarity of two
+#				runs is the fraction of the smallest MINHASH_SIZE hashes of their union found in both, with a
+#				standard error of about 1/sqrt(MINHASH_SIZE); runs with fewer keys are compared exactly.
+#	HyperLogLog	2^PRECISION registers, each the largest number of leading zeros (+1) among the hashes that fall
+#				in it. The number of distinct keys is estimated with a standard error of about 1.04/sqrt(2^PRECISION),
+#				and the registers of several runs combine by their maximum, which estimates the size of their union.
+#
+#So every run is compared with every other run from its sketch alone, without holding its keys in memory.
+#Keys are hashed and added to a sketch in blocks of BLOCK keys with array operations, so building a sketch
+#needs memory for one block beyond the sketch itself. The hash of a key combines the hashes of its fields, so
+#that a parsed table (see EncodeRows in trypn/dictionary.py) is sketched by hashing each of its strings once
+#(8 bytes for each string of the table, which is in memory already).
+#
+#The sketch of a run is built once and kept with it: in the sketches table of a database when the run is loaded
+#(see trypn/database.py), or for a file in the cache (see trypn/cache.py) the first time it is sketched, from its
+#parsed rows if another command has cached them already (see ReadFile in trypn/mascot.py). The exact comparisons
+#do not build sketches.
+
+import hashlib
+from array import array
+from itertools import islice
+
+import numpy as np		#numpy is installed with pandas
+
+from trypn import cache, profiler
+from trypn.mascot import ReadPeptides, ReadProteins, CachedTable, CleanMod, TableKey, CACHED_COLUMNS, PEPTIDE_MARKER, PROTEIN_MARKER
+
+MINHASH_SIZE = 1024			#Hashes kept in a MinHash sketch (8 KB)
+PRECISION = 14				#Bits of the hash that choose the HyperLogLog register: 16384 registers (16 KB)
+RANK_BITS = 52				#Bits of the hash that give the rank in a register; exact as a float
+BLOCK = 65536				#Keys hashed at a time
+
+#The keys sketched for each type of export, as read by ReadPeptides and ReadProteins: {type of export:
+#(kind, columns of the key in CACHED_COLUMNS, function that cleans the strings of each column or None)}
+KEYS = {
+	PEPTIDE_MARKER: ("peptides", ["seq", "mod"], [None, CleanMod]),
+	PROTEIN_MARKER: ("proteins", ["accession"], [None]),
+}
+
+#64-bit hashes of strings, as an array
+def StringHashes(strings):
+	hashes = np.empty(len(strings), dtype=np.uint64)
+	for i in range(0, len(strings), BLOCK):
+		digests = b"".join([hashlib.blake2b(each.encode(), digest_size=8).digest() for each in strings[i:i+BLOCK]])
+		hashes[i:i+BLOCK] = np.frombuffer(digests, dtype=np.uint64)
+	return hashes
+
+#Hash of each key from the hashes of its fields (a list of arrays, one for each field); each step is
+#the splitmix64 finalizer, so the hash of a key depends on every field and on their order
+def Combine(fields):
+	hashes = np.zeros(len(fields[0]), dtype=np.uint64)
+	for field in fields:
+		hashes ^= field
+		hashes ^= hashes >> np.uint64(30)
+		hashes *= np.uint64(0xbf58476d1ce4e5b9)
+		hashes ^= hashes >> np.uint64(27)
+		hashes *= np.uint64(0x94d049bb133111eb)
+		hashes ^= hashes >> np.uint64(31)
+	return hashes
+
+#MinHash sketch of an array of distinct hashes: the MINHASH_SIZE smallest, sorted
+def MinHash(hashes):
+	if len(hashes) > MINHASH_SIZE: hashes = np.partition(hashes, MINHASH_SIZE-1)[:MINHASH_SIZE]
+	return np.sort(hashes)
+
+#Add an array of hashes to HyperLogLog registers
+def AddRegisters(registers, hashes):
+	index = (hashes >> np.uint64(64-PRECISION)).astype(np.intp)
+	rest = ((hashes << np.uint64(PRECISION)) >> np.uint64(64-RANK_BITS)).astype(np.float64)
+	rank = (RANK_BITS + 1 - np.frexp(rest)[1]).astype(np.uint8)		#Leading zeros + 1; frexp is exact, unlike log2
+	np.maximum.at(registers, index, rank)
+
+class SketchBuilder:
+	def __init__(self):
+		self.minhash = np.zeros(0, dtype=np.uint64)
+		self.registers = np.zeros(1 << PRECISION, dtype=np.uint8)
+
+	#Add a block of key hashes; repeated keys are allowed
+	def Add(self, hashes):
+		AddRegisters(self.registers, hashes)
+		if len(self.minhash) == MINHASH_SIZE: hashes = hashes[hashes < self.minhash[-1]]
+		self.minhash = MinHash(np.union1d(self.minhash, hashes))
+
+	#(MinHash, HyperLogLog registers)
+	def Sketch(self):
+		return self.minhash, self.registers
+
+#Sketch of keys (strings, or tuples of strings such as peptides), read BLOCK keys at a time
+def Sketch(keys):
+	builder = SketchBuilder()
+	keys = iter(keys)
+	for block in iter(lambda: list(islice(keys, BLOCK)), []):
+		if type(block[0]) == tuple: builder.Add(Combine([StringHashes(field) for field in zip(*block)]))
+		else: builder.Add(Combine([StringHashes(block)]))
+	return builder.Sketch()
+
+#Sketch of the keys of a parsed (strings, columns) table: each key is the strings of columns in a row, each cleaned by
+#the function of its column in cleaners if it is not None. Each string of a column is hashed once.
+def TableSketch(strings, columns, cleaners):
+	lookups = []
+	columns = [np.frombuffer(column, dtype=np.uint32) for column in columns]
+	for column, clean in zip(columns, cleaners):
+		used = np.flatnonzero(np.bincount(column, minlength=len(strings)))
+		lookup = np.zeros(len(strings), dtype=np.uint64)
+		if clean is None: lookup[used] = StringHashes([strings[i] for i in used])
+		else: lookup[used] = StringHashes([clean(strings[i]) for i in used])
+		lookups.append(lookup)
+
+	builder = SketchBuilder()
+	for i in range(0, len(columns[0]), BLOCK):
+		builder.Add(Combine([lookup[column[i:i+BLOCK]] for lookup, column in zip(lookups, columns)]))
+	return builder.Sketch()
+
+#Sketch as bytes, to be stored, and back
+def SketchBytes(sketch):
+	minhash, registers = sketch
+	return minhash.astype("<u8").tobytes(), registers.tobytes()
+
+def BytesSketch(minhash, registers):
+	return np.frombuffer(minhash, dtype="<u8").astype(np.uint64), np.frombuffer(registers, dtype=np.uint8)
+
+#Type of export of a kind of key ("peptides" or "proteins")
+def KindMarker(kind):
+	if kind == "proteins": return PROTEIN_MARKER
+	return PEPTIDE_MARKER
+
+#Keys of the cache entries a sketch of the peptides or proteins (kind) of a file is made from: its own, then
+#that of the parsed rows
+def SketchKeys(kind):
+	return ["sketch:"+kind+":"+str(MINHASH_SIZE)+":"+str(PRECISION), TableKey(KindMarker(kind))]
+
+#Cached sketch of the peptides or proteins (kind) of a file, or None
+def LoadSketch(path, kind):
+	table = cache.Load(path, SketchKeys(kind)[0])
+	if table is None: return None
+	minhash, registers = [np.frombuffer(column, dtype=np.uint32) for column in table[1]]
+	return minhash.view(np.uint64), registers.view(np.uint8)
+
+#Sketch the keys of the parsed table of a file of a type of export (marker) and cache the sketch next to the table.
+#Returns the sketch.
+def StoreTableSketch(path, marker, table):
+	kind, names, cleaners = KEYS[marker]
+	strings, columns = table
+	with profiler.Stage("sketch "+str(path)):
+		sketch = TableSketch(strings, [columns[CACHED_COLUMNS[marker].index(name)] for name in names], cleaners)
+	cache.Store(path, SketchKeys(kind)[0], [], [array("I", each.tobytes()) for each in sketch])		#Both sizes are multiples of 4 bytes
+	return sketch
+
+#Sketch of the peptides or proteins (kind) of a file: from the cache, or from its parsed rows (parsing the file if
+#they are not cached), caching the sketch
+def FileSketch(path, kind="peptides"):
+	sketch = LoadSketch(path, kind)
+	if sketch is not None: return sketch
+
+	marker = KindMarker(kind)
+	if cache.ENABLED:
+		table = CachedTable(path, marker)
+		if table is not None: return StoreTableSketch(path, marker, table)
+
+	#Without the cache, or for an export that lacks a cached column: sketch the rows as they are read
+	read = ReadPeptides
+	if kind == "proteins": read = ReadProteins
+	with profiler.Stage("sketch "+str(path)):
+		return Sketch(profiler.Rows("rows", read(path, False)))
+
+#Estimated number of distinct keys from HyperLogLog registers (of one run, or the maximum of several)
+def Cardinality(registers):
+	m = len(registers)
+	alpha = 0.7213/(1 + 1.079/m)
+	estimate = alpha*m*m/np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+
+	zeros = int(np.count_nonzero(registers == 0))
+	if estimate <= 2.5*m and zeros: return m*np.log(m/zeros)		#Linear counting for small sets
+	return float(estimate)
+
+#Estimated Jaccard similarity of two runs from their MinHash sketches
+def Jaccard(a, b):
+	union = np.union1d(a, b)[:MINHASH_SIZE]
+	if len(union) == 0: return 1.0
+
+	both = np.intersect1d(a, b, assume_unique=True)
+	return int(np.count_nonzero(both <= union[-1]))/len(union)
+
+#Pairwise estimates among runs from their sketches: (Jaccard similarity, shared keys), each a list of rows
+def Similarities(sketches):
+	n = len(sketches)
+	jaccard = [[1.0]*n for i in range(n)]
+	shared = [[0.0]*n for i in range(n)]
+	for i in range(n):
+		shared[i][i] = Cardinality(sketches[i][1])
+		for j in range(i+1, n):
+			jaccard[i][j] = jaccard[j][i] = Jaccard(sketches[i][0], sketches[j][0])
+			union = Cardinality(np.maximum(sketches[i][1], sketches[j][1]))
+			shared[i][j] = shared[j][i] = jaccard[i][j]*union
+
+	return jaccard, shared
+
+#Write the estimated distinct keys of each run and of all runs, and the Jaccard similarity and shared keys of
+#every pair of runs, tab-delimited
+def WriteSimilarities(sketches, names, labels, fout):
+	jaccard, shared = Similarities(sketches)
+
+	print("ESTIMATED DISTINCT (HyperLogLog, standard error "+str(round(104/(1 << PRECISION)**0.5, 2))+"%):", file=fout)
+	for i in range(len(names)):
+		print(names[i], labels[i], round(shared[i][i]), sep="\t", file=fout)
+	if sketches:
+		union = Cardinality(np.maximum.reduce([registers for minhash, registers in sketches]))
+		print("IN ANY RUN:", round(union), file=fout)
+
+	print("\nJACCARD SIMILARITY (MinHash, standard error "+str(round(1/MINHASH_SIZE**0.5, 3))+"):", file=fout)
+	print("", *names, sep="\t", file=fout)
+	for i in range(len(names)):
+		print(names[i], *[round(each, 4) for each in jaccard[i]], sep="\t", file=fout)
+
+	print("\nESTIMATED SHARED:", file=fout)
+	print("", *names, sep="\t", file=fout)
+	for i in range(len(names)):
+		print(names[i], *[round(each) for each in shared[i]], sep="\t", file=fout)
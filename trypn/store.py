@@ -0,0 +1,137 @@
+#Persistent membership store for overlaps among a growing set of replicates.
+#
+#A store file holds every key (peptide or protein accession) of the files added so far with its bitmask
+#of the files it is found in (see trypn/overlap.py), and the histogram of the masks. Adding a file reads
+#only that file: its keys get the next bit, and the histogram is updated for the keys whose mask changes.
+#The overlap statistics are written from the histogram without reading any of the files again, so adding
+#the 25th replicate of a project costs the parse of one file, not 25.
+#
+#Files are recognized by their content hash, so a file that is already in the store is not added twice
+#(unless Add is told otherwise, as the watcher does, whose inputs are the paths of a directory; see trypn/watch.py).
+#When a file changes, Replace swaps its keys for the new ones, and the file keeps its bit.
+#The store is written with marshal, as the cache (see trypn/cache.py), to a temporary file that replaces
+#the store once it is complete.
+
+import marshal
+import os
+from collections import Counter
+
+from trypn import profiler
+from trypn.cache import FileDigest
+from trypn.mascot import ReadPeptides, ReadProteins
+
+VERSION = 1
+READERS = {"peptides": ReadPeptides, "proteins": ReadProteins}		#Type of key kept in a store: reader
+
+class MembershipStore:
+	#Open the store at path, or start a new one if it does not exist.
+	#kind is "peptides" or "proteins"; an existing store must be of the same kind (None accepts either).
+	def __init__(self, path, kind=None):
+		self.path = path
+
+		if os.path.exists(path):
+			self.Load()
+			if kind is not None and kind != self.kind:
+				raise ValueError("Store "+path+" holds "+self.kind+", not "+kind)
+		else:
+			self.kind = kind or "peptides"
+			self.inputs = []			#(name, absolute path, content hash) of each file, in order of their bits
+			self.masks = {}				#{key: mask}
+			self.histogram = Counter()	#{mask: number of keys}
+
+	def Load(self):
+		fin = open(self.path, "rb")
+		with profiler.Stage("load store"):
+			version, self.kind, self.inputs, self.masks, histogram = marshal.load(fin)
+		fin.close()
+
+		if version != VERSION: raise ValueError("Store "+self.path+" was written by another version (store version "+str(version)+")")
+		self.inputs = [tuple(each) for each in self.inputs]
+		self.histogram = Counter(histogram)
+
+	def Save(self):
+		temp = self.path+".tmp"+str(os.getpid())
+		fout = open(temp, "wb")
+		with profiler.Stage("save store"):
+			marshal.dump((VERSION, self.kind, self.inputs, self.masks, dict(self.histogram)), fout)
+		fout.close()
+		os.replace(temp, self.path)
+
+	#Set of the keys of a file
+	def ReadKeys(self, path):
+		with profiler.Stage("read "+path):
+			keys = set(profiler.Rows("rows", READERS[self.kind](path, cached=False)))
+		profiler.Count("unique_keys", len(keys))
+		return keys
+
+	#Add the keys of a file as the next input, named name (default: the file name).
+	#keys and digest are the keys and the content hash of the file, if they are known already.
+	#Returns False without changing the store if a file with the same content was added before, unless unique=False,
+	#which adds every path as its own input.
+	def Add(self, path, name=None, keys=None, digest=None, unique=True):
+		if digest is None: digest = FileDigest(path)
+		if unique and digest in [each[2] for each in self.inputs]: return False
+
+		bit = 1 << len(self.inputs)
+		masks = self.masks
+		histogram = self.histogram
+
+		if keys is None: keys = self.ReadKeys(path)
+
+		with profiler.Stage("update store"):
+			for key in keys:
+				mask = masks.get(key, 0)
+				if mask:
+					histogram[mask] -= 1
+					if histogram[mask] == 0: del histogram[mask]
+				masks[key] = mask | bit
+				histogram[mask | bit] += 1
+
+		self.inputs.append((name or os.path.basename(path), os.path.abspath(path), digest))
+		return True
+
+	#Replace the keys of input i by the keys of the new content of its file at path; the input keeps its bit.
+	#keys and digest are as in Add. Every key is visited to clear the bit, which costs about as much as adding a file.
+	def Replace(self, i, path, keys=None, digest=None):
+		if digest is None: digest = FileDigest(path)
+		if keys is None: keys = self.ReadKeys(path)
+
+		bit = 1 << i
+		masks = self.masks
+		histogram = self.histogram
+
+		with profiler.Stage("update store"):
+			for key in [key for key, mask in masks.items() if mask & bit and key not in keys]:
+				mask = masks[key]
+				histogram[mask] -= 1
+				if histogram[mask] == 0: del histogram[mask]
+				if mask == bit: del masks[key]
+				else:
+					masks[key] = mask & ~bit
+					histogram[mask & ~bit] += 1
+
+			for key in keys:
+				mask = masks.get(key, 0)
+				if mask & bit: continue
+				if mask:
+					histogram[mask] -= 1
+					if histogram[mask] == 0: del histogram[mask]
+				masks[key] = mask | bit
+				histogram[mask | bit] += 1
+
+		name = self.inputs[i][0]
+		self.inputs[i] = (name, os.path.abspath(path), digest)
+
+	#Index of the input read from path, or None
+	def Index(self, path):
+		paths = self.Paths()
+		if os.path.abspath(path) in paths: return paths.index(os.path.abspath(path))
+		return None
+
+	#Names of the inputs in order
+	def Names(self):
+		return [each[0] for each in self.inputs]
+
+	#Paths of the inputs in order
+	def Paths(self):
+		return [each[1] for each in self.inputs]
@@ -0,0 +1,184 @@
+#Watch a directory for new or changed MASCOT exports and keep the reports up to date.
+#
+#The directory is scanned every few seconds. An export (.csv, or a compressed .csv; see trypn/compressed.py)
+#is processed once its size and modification time have not changed for a few seconds, so that files still
+#being written by the search are left alone. Each export is parsed exactly once: a peptide export gives its
+#cleavage counts (see trypn/cleavages.py) and its peptides in the same pass, and a protein export its proteins.
+#The results are kept in a persistent state in the output directory:
+#	PREFIX.state			size, modification time, content hash and type of each export, and the cleavage
+#						counts of each peptide export
+#	PREFIX_peptides.store	membership store of the peptides of the peptide exports (see trypn/store.py)
+#	PREFIX_proteins.store	membership store of the proteins of the protein exports
+#
+#After each scan, only the reports that depend on the exports that were added or changed are written again:
+#	PREFIX_cleavages.log, PREFIX_summary.log, PREFIX_summary2.log and PREFIX_table.log (as calc_cleavages.py)
+#	PREFIX_peptide_overlaps.log and PREFIX_protein_overlaps.log (as compare_overlaps.py)
+#so a report is up to date seconds after an export is written, and restarting the watcher reads no export again.
+#
+#A changed export replaces its old content in every report; an export whose content is unchanged (e.g. touched
+#or copied over) is not read again. Each export is an input of the reports, even a copy of another one, so that
+#it stays in them when the other one changes. Exports removed from the directory stay in the reports.
+
+import marshal
+import os
+import time
+
+import numpy as np		#numpy is installed with pandas
+
+from trypn import compressed, profiler
+from trypn.cache import FileDigest
+from trypn.cleavages import CountRows, WriteCounts
+from trypn.mascot import StreamFile, ExportKind, CleanMod, PEPTIDE_MARKER, PROTEIN_MARKER
+from trypn.overlap import InputNames, WriteOverlaps
+from trypn.store import MembershipStore
+
+VERSION = 1
+INTERVAL = 5				#Seconds between scans
+SETTLE = 5					#Seconds an export must be unchanged before it is processed
+
+#True if the name of a file is that of an export
+def IsExport(name):
+	if compressed.IsCompressed(name): name = os.path.splitext(name)[0]
+	return name.lower().endswith(".csv")
+
+class Watcher:
+	#Watch directory, keeping the state and the reports in output_dir with names starting with prefix
+	def __init__(self, directory, output_dir=".", prefix="watch"):
+		self.directory = directory
+		self.prefix = os.path.join(output_dir, prefix)
+		self.path = self.prefix+".state"
+		self.stores = {PEPTIDE_MARKER: MembershipStore(self.prefix+"_peptides.store", "peptides"),
+			PROTEIN_MARKER: MembershipStore(self.prefix+"_proteins.store", "proteins")}
+
+		self.files = {}			#{absolute path: (size, modification time, content hash, type of export)}
+		self.counts = {}		#{absolute path: (peptide counts, cleavage counts)} of each peptide export, as lists
+		if os.path.exists(self.path): self.Load()
+
+	def Load(self):
+		fin = open(self.path, "rb")
+		version, self.files, self.counts = marshal.load(fin)
+		fin.close()
+
+		if version != VERSION: raise ValueError("Watch state "+self.path+" was written by another version (state version "+str(version)+")")
+		self.files = {path: tuple(each) for path, each in self.files.items()}
+
+	#Save the state and the stores of the given types of export (default all); each file is written to
+	#a temporary file that replaces it once complete
+	def Save(self, kinds=None):
+		for kind in kinds or self.stores:
+			self.stores[kind].Save()
+
+		temp = self.path+".tmp"+str(os.getpid())
+		fout = open(temp, "wb")
+		marshal.dump((VERSION, self.files, self.counts), fout)
+		fout.close()
+		os.replace(temp, self.path)
+
+	#True if an export is in the state and, if it is a MASCOT export, in the store of its type (a copy of another
+	#export was left out of the store by earlier versions, so it is read again)
+	def Known(self, path):
+		if path not in self.files: return False
+		kind = self.files[path][3]
+		return kind is None or self.stores[kind].Index(path) is not None
+
+	#Exports of the directory that are new or changed and have settled: [(absolute path, size, modification time)],
+	#oldest first
+	def Changed(self, settle=SETTLE):
+		changed = []
+		now = time.time()
+		for name in sorted(os.listdir(self.directory)):
+			path = os.path.abspath(os.path.join(self.directory, name))
+			if not IsExport(name) or not os.path.isfile(path): continue
+
+			stat = os.stat(path)
+			if self.Known(path) and self.files[path][:2] == (stat.st_size, stat.st_mtime_ns): continue
+			if now - stat.st_mtime < settle: continue
+			changed.append((stat.st_mtime_ns, path, stat.st_size))
+
+		return [(path, size, mtime) for mtime, path, size in sorted(changed)]
+
+	#Read an export and add it to the state, or replace its old content. Returns the type of export, or None
+	#if the export was not read again (unchanged content, or not a MASCOT export).
+	def Update(self, path, size, mtime):
+		digest = FileDigest(path)
+		old = self.files.get(path)
+		if old is not None and old[2] == digest and self.Known(path):
+			self.files[path] = (size, mtime, digest, old[3])
+			return None
+
+		kind = ExportKind(path)
+		if old is not None and None not in (old[3], kind) and old[3] != kind:
+			raise ValueError("the export changed from a "+old[3]+" to a "+kind+" export")
+
+		if kind == PEPTIDE_MARKER:
+			#The cleavages and the peptides of the export from one read
+			keys = set()
+			def Rows():
+				for row in profiler.Rows("rows", StreamFile(path, PEPTIDE_MARKER, ["prev_aa", "seq", "next_aa", "mod"])):
+					keys.add((row[1], CleanMod(row[3])))
+					yield row
+			with profiler.Stage("read "+path):
+				peptides, cleavages = CountRows(Rows())
+		elif kind == PROTEIN_MARKER:
+			with profiler.Stage("read "+path):
+				keys = set(profiler.Rows("rows", StreamFile(path, PROTEIN_MARKER, ["accession"])))
+
+		self.files[path] = (size, mtime, digest, kind)
+		if kind is None: return None
+
+		store = self.stores[kind]
+		i = store.Index(path)
+		if i is None: store.Add(path, keys=keys, digest=digest, unique=False)
+		else: store.Replace(i, path, keys, digest)
+		if kind == PEPTIDE_MARKER: self.counts[path] = (peptides.tolist(), cleavages.tolist())
+
+		return kind
+
+	#Rewrite the reports that depend on the exports of the given types; returns the files written
+	def WriteReports(self, kinds):
+		written = []
+		if PEPTIDE_MARKER in kinds:
+			paths = self.stores[PEPTIDE_MARKER].Paths()
+			peptides = np.array([self.counts[path][0] for path in paths], dtype=np.int64)
+			cleavages = np.array([self.counts[path][1] for path in paths], dtype=np.int64)
+			with profiler.Stage("write cleavages"):
+				WriteCounts(peptides, cleavages, [os.path.basename(path) for path in paths], self.prefix)
+			written += [self.prefix+each for each in ["_summary.log", "_summary2.log", "_cleavages.log", "_table.log"]]
+
+		for kind, name in [(PEPTIDE_MARKER, "_peptide_overlaps.log"), (PROTEIN_MARKER, "_protein_overlaps.log")]:
+			if kind not in kinds: continue
+			store = self.stores[kind]
+			fout = open(self.prefix+name, "w+")
+			WriteOverlaps(store.histogram, InputNames(len(store.inputs)), store.Paths(), fout)
+			fout.close()
+			written.append(self.prefix+name)
+
+		return written
+
+	#Process the new and changed exports and rewrite the affected reports; progress is called with each
+	#export and what was done with it. Returns the files written.
+	def Scan(self, settle=SETTLE, progress=None):
+		kinds = set()
+		for path, size, mtime in self.Changed(settle):
+			try:
+				kind = self.Update(path, size, mtime)
+			except Exception as error:		#A bad export must not stop the watcher; it is read again once it changes
+				self.files[path] = (size, mtime, None, None)
+				if progress is not None: progress(path, "FAILED: "+str(error))
+				continue
+
+			if kind is not None: kinds.add(kind)
+			if progress is None: continue
+			if kind is None: progress(path, "UNCHANGED OR NOT AN EXPORT")
+			else: progress(path, "READ")
+
+		if not kinds: return []
+		self.Save(kinds)
+		return self.WriteReports(kinds)
+
+	#Scan every interval seconds until interrupted
+	def Run(self, interval=INTERVAL, settle=SETTLE, progress=None, written=None):
+		while True:
+			outputs = self.Scan(settle, progress)
+			if outputs and written is not None: written(outputs)
+			time.sleep(interval)